@@ -0,0 +1,155 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Final
+
+# the airtable scripts import each other as top level modules
+ROOT:Final = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "excercises", "airtable"))
+
+import airtable_json_update
+import compressed_json
+import extract_filter_evaluate
+from excercises.count_highest import count, count_stream, count_vectorized
+from synthetic_data import generate_tables
+
+# times the cpu bound helpers on seeded synthetic data and compares them with the saved baselines.
+#   python benchmarks/microbench.py --sizes 1000 10000 --save      # records the baselines
+#   python benchmarks/microbench.py --sizes 1000 10000             # fails when a function got slower
+
+BASELINE_FILE:Final = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+SIZES:Final = [10**3, 10**4, 10**5, 10**6]
+THRESHOLD:Final = 0.25
+REPEAT:Final = 3
+
+
+def generate_integers(n:int, seed:int=42, high:int=1_000_000) -> list[int]:
+    rng = random.Random(seed)
+    return [rng.randint(0, high) for _ in range(n)]
+
+
+def extracted_applicants(combined:dict) -> dict:
+    """ the shape returned by extract_filter_evaluate.extract() """
+    out = {}
+    for i, (applicant, data) in enumerate(combined.items()):
+        text, sha = airtable_json_update.compress(data)
+        out[applicant] = {"Application_ID": i, "Compressed_JSON": text, "SHA": sha}
+    return out
+
+
+def fresh_decoder():
+    # every run starts with an empty decode cache, so the repeats measure the same work
+    compressed_json._cache = compressed_json.DecodeCache()
+
+
+def cases(n:int, seed:int) -> dict:
+    """ { name: (setup, function) }, setup runs before every measured call and is not timed """
+    tables = generate_tables(n, seed)
+    combined = airtable_json_update.combine_data(tables["Personal_Details"], tables["Work_Experience"], tables["Salary_Prefs"])
+    extracted = extracted_applicants(combined)
+    experiences = [data.get("experience", []) for data in combined.values()]
+    integers = generate_integers(n, seed)
+
+    def validate_all():
+        for x in extracted.values():
+            extract_filter_evaluate.is_valid_applicant(x)
+
+    def years_all():
+        for x in experiences:
+            extract_filter_evaluate.calculate_experience_years(x)
+
+    nothing = lambda: None
+    return {
+        "combine_data": (nothing, lambda: airtable_json_update.combine_data(
+            tables["Personal_Details"], tables["Work_Experience"], tables["Salary_Prefs"])),
+        "is_valid_applicant": (fresh_decoder, validate_all),
+        "filter": (fresh_decoder, lambda: extract_filter_evaluate.filter(extracted)),
+        "calculate_experience_years": (nothing, years_all),
+        "count": (nothing, lambda: count(integers)),
+        "count_vectorized": (nothing, lambda: count_vectorized(integers)),
+        "count_stream": (nothing, lambda: count_stream(iter(integers))),
+    }
+
+
+def measure(setup:Callable, function:Callable, repeat:int) -> dict:
+    """ best wall time of `repeat` runs, then one traced run for the peak memory """
+    timings = []
+    for _ in range(repeat):
+        setup()
+        gc.collect()
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+
+    setup()
+    gc.collect()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(timings), "peak_bytes": peak}
+
+
+def compare(results:dict, baselines:dict, threshold:float) -> list[str]:
+    """ the functions that are slower than their baseline by more than the threshold """
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+        limit = baseline["seconds"] * (1 + threshold)
+        if result["seconds"] > limit:
+            regressions.append(f"{key}: {result['seconds']:.4f}s, baseline {baseline['seconds']:.4f}s")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="microbenchmarks of the cpu bound helpers")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--functions", nargs="+", help="only these functions")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="saves the results as the new baselines")
+    args = parser.parse_args()
+
+    results = {}
+    for n in args.sizes:
+        for name, (setup, function) in cases(n, args.seed).items():
+            if args.functions and name not in args.functions:
+                continue
+            result = measure(setup, function, args.repeat)
+            results[f"{name}/{n}"] = result
+            print(f"{name:28} {n:>9} {result['seconds']:>10.4f}s {result['peak_bytes'] / 2**20:>9.1f} MiB")
+
+    if args.save:
+        baselines = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baselines = json.load(f)
+        baselines.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"baselines saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baselines yet, run with --save first")
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import argparse
+import copy
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Final
+
+ROOT:Final = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from excercises.persistent_dict import freeze
+
+# snapshot + nested update of a large state: dict.copy ( shares the nested values, so the snapshot
+# still changes ), copy.deepcopy ( copies everything ) and PersistentDict ( shares all but the path ).
+#   python benchmarks/persistent_dict_bench.py --sizes 1000 10000 100000 1000000
+
+SIZES:Final = [10**3, 10**4, 10**5, 10**6]
+UPDATES:Final = 100
+
+
+def generate_state(n:int) -> dict:
+    """ n users in a nested config / state like structure """
+    return {"users": {f"user{i}": {"id": i, "settings": {"theme": "dark", "limits": [i, i * 2]}} for i in range(n)},
+            "version": 0}
+
+
+def best(function:Callable, repeat:int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(n:int, updates:int, repeat:int, deepcopy_max:int) -> dict:
+    state = generate_state(n)
+    frozen = freeze(state)
+    keys = [f"user{i * max(1, n // updates) % n}" for i in range(updates)]
+
+    def with_copy():
+        current = state
+        for i, key in enumerate(keys):
+            current = current.copy()
+            current["users"][key]["settings"]["theme"] = f"light{i}"
+
+    def with_deepcopy():
+        current = state
+        for i, key in enumerate(keys):
+            current = copy.deepcopy(current)
+            current["users"][key]["settings"]["theme"] = f"light{i}"
+
+    def with_persistent():
+        current = frozen
+        for i, key in enumerate(keys):
+            snapshot = current.snapshot()
+            current = current.set_in(("users", key, "settings", "theme"), f"light{i}")
+        return snapshot
+
+    result = {"keys": n,
+              "copy": best(with_copy, repeat) / updates,
+              "persistent": best(with_persistent, repeat) / updates}
+    if n <= deepcopy_max:
+        result["deepcopy"] = best(with_deepcopy, 1) / updates
+
+    # memory kept by the snapshots themselves
+    tracemalloc.start()
+    current, snapshots = frozen, []
+    for i, key in enumerate(keys):
+        snapshots.append(current)
+        current = current.set_in(("users", key, "settings", "theme"), f"light{i}")
+    result["persistent_bytes"] = tracemalloc.get_traced_memory()[0] / updates
+    tracemalloc.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="snapshot and nested update cost, dict vs PersistentDict")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--updates", type=int, default=UPDATES, help="snapshots + updates per run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--deepcopy-max", type=int, default=10**5, help="deepcopy is skipped above this size")
+    args = parser.parse_args()
+
+    print(f"{'keys':>9} {'copy (wrong)':>14} {'deepcopy':>12} {'persistent':>12} {'bytes/snapshot':>15}")
+    for n in args.sizes:
+        r = run(n, args.updates, args.repeat, args.deepcopy_max)
+        deep = f"{r['deepcopy'] * 1e6:>10.1f}us" if "deepcopy" in r else f"{'skipped':>12}"
+        print(f"{n:>9} {r['copy'] * 1e6:>12.1f}us {deep} {r['persistent'] * 1e6:>10.1f}us {r['persistent_bytes']:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,41 @@
 import requests
 import json
-import dotenv, os, hashlib
+import dotenv, os, sys
 import aiohttp
 from aiohttp import ClientSession 
 import asyncio
-from typing import Final
+import itertools
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Final, Tuple
+from journal import FAILED, OK, Journal
+import metrics
+from rate_limiter import AdaptiveLimiter, get_limiter
+from compressed_json import encode_compressed_json
+from mirror_store import APPLICANTS, OVERLAP, TABLES, MirrorStore, airtable_time
+from applicant_join import (PERSONAL_KEYS, EXPERIENCE_KEYS, SALARY_KEYS, 
+                            PERSONAL, EXPERIENCE, SALARY, join_rows, join_stream)
 
 # Ideally, I would keep them under separate classes that can be passed around.
 # for this exercise, having a global variable should be sufficient
 HEADERS = {}
 AIRTABLE_BASE_ID = ""
 AIRTABLE_API_TOKEN = ""
+# can point to a local stand-in server ( see standin_server.py )
+AIRTABLE_API_URL = "https://api.airtable.com/v0"
+# zlib + base64 Compressed_JSON ( see compressed_json.py ), the readers decode both encodings
+COMPACT_JSON = False
 
 def init():
 
     dotenv.load_dotenv()
     
-    global AIRTABLE_API_TOKEN, AIRTABLE_BASE_ID
+    global AIRTABLE_API_TOKEN, AIRTABLE_BASE_ID, AIRTABLE_API_URL, COMPACT_JSON
     
     AIRTABLE_API_TOKEN = os.getenv("AIRTABLE_API_TOKEN")
     AIRTABLE_BASE_ID = os.getenv("AIRTABLE_BASE_ID")
+    AIRTABLE_API_URL = os.getenv("AIRTABLE_API_URL", AIRTABLE_API_URL)
+    COMPACT_JSON = os.getenv("COMPACT_JSON", "").lower() in ("1", "true", "yes")
     
     if AIRTABLE_API_TOKEN is None or AIRTABLE_BASE_ID is None:
         raise Exception(f"AIRTABLE_BASE_ID or AIRTABLE_API_TOKEN is not set. please make sure the .env file contains these values")
@@ -31,119 +47,463 @@ def init():
     }
 
 
-def fetch_data_from_airtable(table_name):
-    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{table_name}"
-    response = requests.get(url, headers=HEADERS)
+# Airtable returns at most 100 records per page, the rest is behind the "offset" cursor
+PAGE_SIZE:Final = 100
+POOL_SIZE:Final = 10
+
+def limiter() -> AdaptiveLimiter:
+    return get_limiter(AIRTABLE_BASE_ID)
+
+
+def endpoint(url:str) -> str:
+    """ the table name of an airtable url, used to tag the metrics """
+    return url.split(f"/{AIRTABLE_BASE_ID}/", 1)[-1].split("/", 1)[0].split("?", 1)[0]
+
+
+def airtable_request(method:str, url:str, max_retries=3, **kwargs) -> requests.Response:
+    """ blocking airtable call that goes through the rate limiter of the base,
+        429 and 5xx responses are retried, the last response is raised if it still failed.
+        only for synchronous code, the coroutines use the aiohttp session ( see send_batch )
+    """
+    for attempt in range( 1, max_retries+1 ):
+        limiter().wait_sync()
+        with metrics.timer("airtable_request", method=method, endpoint=endpoint(url)):
+            response = requests.request(method, url, headers=HEADERS, **kwargs)
+        metrics.inc("airtable_bytes_received_total", len(response.content), endpoint=endpoint(url))
+        limiter().record(response.status_code, response.headers.get("Retry-After"))
+        
+        if response.status_code != 429 and response.status_code < 500:
+            break
+        metrics.inc("airtable_retries_total", method=method, endpoint=endpoint(url), status=response.status_code)
+        if attempt < max_retries:
+            wait_time = limiter().backoff(attempt)
+            print(f"Attempt {attempt}: Failed ({response.status_code}), retrying in {wait_time:.1f} seconds...")
+            time.sleep(wait_time)
+        
     response.raise_for_status()
-    records = response.json().get("records", [])
-    # Extract just the fields
-    return [record["fields"] for record in records]
+    return response
 
 
-async def  update_compressed_json(recordId:str, data:dict, max_retries=3) -> bool:
-    
-    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/Applicants/{recordId}"
+def fetch_data_from_airtable(table_name):
+    url = f"{AIRTABLE_API_URL}/{AIRTABLE_BASE_ID}/{table_name}"
+    params = {"pageSize": PAGE_SIZE}
+    fields = []
+    while True:
+        response = airtable_request("GET", url, params=params)
+        body = response.json()
+        # Extract just the fields
+        fields.extend(record["fields"] for record in body.get("records", []))
+        
+        offset = body.get("offset")
+        if not offset:
+            return fields
+        params["offset"] = offset
+
+
+def create_session(limit:int=POOL_SIZE) -> ClientSession:
+    """ one pooled session shared by all the requests of a run, 
+        so the TLS handshake is paid once per connection and not once per request
+    """
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit)
+    return aiohttp.ClientSession(connector=connector)
+
 
-    compressed_json = json.dumps(data, separators=(',', ':'))
-    sha256_hash = hashlib.sha256(compressed_json.encode('utf-8')).hexdigest()
+async def fetch_records_stream(session:ClientSession, table_name:str, params:dict|None=None) -> AsyncIterator[dict]:
+    """ async generator that follows the "offset" cursor of the table 
+        and yields the raw records ( id + fields ) as soon as each page arrives
+    """
+    url = f"{AIRTABLE_API_URL}/{AIRTABLE_BASE_ID}/{table_name}"
+    query = dict(params or {})
+    query["pageSize"] = PAGE_SIZE
     
-    payload = {
-        "fields": {
-            "Compressed_JSON": compressed_json,
-            "Shortlist_status": "Pending",
-            "SHA": sha256_hash,
-            "LLM_Summary": "",
-            "LLM_Score": 0,
-            "Follow_Ups": ""   
-        }
-    }
+    while True:
+        body = await get_page(session, url, query)
+            
+        for record in body.get("records", []):
+            yield record
+            
+        offset = body.get("offset")
+        if not offset:
+            break
+        query["offset"] = offset
 
-    async with aiohttp.ClientSession() as session:
-        for attempt in range( 1, max_retries+1 ):
-            try:
-                async with session.patch(url, headers=HEADERS, json=payload) as response:
-                    if response.status == 200:
-                        #print(f"record {recordId} updated successfully")
-                        return True
-                    else:
-                        body = await response.text()
-                        print(f"Attempt {attempt}: Failed ({response.status}) - {body}")
-            except Exception as e:
-                print(f"Attempt {attempt} failed with {e}")
+
+async def get_page(session:ClientSession, url:str, query:dict, max_retries=3) -> dict:
+    for attempt in range( 1, max_retries+1 ):
+        async with limiter():
+            with metrics.timer("airtable_request", method="GET", endpoint=endpoint(url)):
+                async with session.get(url, headers=HEADERS, params=query) as response:
+                    limiter().record(response.status, response.headers.get("Retry-After"))
+                    if (response.status != 429 and response.status < 500) or attempt == max_retries:
+                        response.raise_for_status()
+                        body = await response.read()
+                        metrics.inc("airtable_bytes_received_total", len(body), endpoint=endpoint(url))
+                        return json.loads(body)
                 
-            wait_time = 2 ** attempt
-            print(f"Retrying in {wait_time} seconds...")
-            await asyncio.sleep(wait_time)
-            
-        return False
+        metrics.inc("airtable_retries_total", method="GET", endpoint=endpoint(url), status=response.status)
+        wait_time = limiter().backoff(attempt)
+        print(f"Attempt {attempt}: Failed ({response.status}), retrying in {wait_time:.1f} seconds...")
+        await asyncio.sleep(wait_time)
+    
+    raise Exception(f"unable to fetch {url}")
 
-        
 
+async def fetch_data_stream(session:ClientSession, table_name:str) -> AsyncIterator[dict]:
+    """ same as fetch_data_from_airtable, but yields the fields page by page """
+    async for record in fetch_records_stream(session, table_name):
+        yield record["fields"]
 
-PERSONAL_KEYS:Final = ["Full Name", "Email", "Location", "LinkedIn"]
-EXPERIENCE_KEYS:Final = ["Company", "Title", "Start", "End", "Technologies"]
-SALARY_KEYS:Final = ["Preferred Rate","Minimum_Rate", "Currency", "Availability"]
 
-def combine_data(personal_data:list, experience_data:list, salary_data:list ) -> dict:
-    data = {}
-    
-    for x in personal_data:
-        if "Email" in x :
-            #print(f"personal = {x}")
-            filtered = {k: x[k] for k in PERSONAL_KEYS if k in x}
-            applicant = x["Applicants"][0]
-            data[applicant] = { "personal": filtered } 
-    
-    for x in experience_data:
-        if "Company" in x:
-            #print(f"experience = {x}")
-            filtered = { k:x[k] for k in EXPERIENCE_KEYS if k in x } 
-            applicant = x["Applicants"][0]
-            if "experience" not in data[applicant]:
-                y = data[applicant] 
-                y["experience"] = [filtered]
+async def fetch_tables_stream(session:ClientSession, table_names:list[str], 
+                             end_markers:bool=False) -> AsyncIterator[Tuple[str, dict|None]]:
+    """ fetches all the tables at the same time and yields ( table_name, fields )
+        in the order the pages arrive. Pages of different tables are interleaved.
+        with end_markers, ( table_name, None ) is yielded once the table is fully read
+    """
+    queue:asyncio.Queue = asyncio.Queue(maxsize=PAGE_SIZE * len(table_names))
+    
+    async def pump(table_name:str):
+        try:
+            async for fields in fetch_data_stream(session, table_name):
+                await queue.put((table_name, fields))
+        except Exception as e:
+            await queue.put((table_name, e))
+            return
+        # None marks the end of a table
+        await queue.put((table_name, None))
+    
+    tasks = [asyncio.create_task(pump(name)) for name in table_names]
+    remaining = len(tasks)
+    try:
+        while remaining > 0:
+            table_name, fields = await queue.get()
+            if fields is None:
+                remaining -= 1
+                if end_markers:
+                    yield table_name, None
+            elif isinstance(fields, Exception):
+                raise fields
             else:
-                y = data[applicant]["experience"]
-                y.append(filtered)
+                yield table_name, fields
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def sync_mirror_table(store:MirrorStore, session:ClientSession, table_name:str, full:bool=False) -> int:
+    """ pulls the records of the table modified since the last sync into the store ( all of them the first time,
+        with full, or when a full sync is due, see FULL_SYNC_EVERY ). an incremental sync can not see the
+        deleted records, a full one removes them. returns the number of records pulled
+    """
+    started = datetime.now(timezone.utc)
+    full = full or store.full_sync_due(table_name, started)
+    since = None if full else store.last_sync(table_name)
+    params = {}
+    if since is not None:
+        params["filterByFormula"] = f"IS_AFTER(LAST_MODIFIED_TIME(), '{since}')"
+
+    pulled = 0
+    seen = set()
+    page = []
+    async for record in fetch_records_stream(session, table_name, params):
+        page.append(record)
+        seen.add(record["id"])
+        if len(page) == PAGE_SIZE:
+            store.upsert(table_name, page)
+            pulled += len(page)
+            page = []
+    store.upsert(table_name, page)
+    pulled += len(page)
+
+    if since is None:
+        store.retain(table_name, seen)
+        store.set_last_full_sync(table_name, started)
+    store.set_last_sync(table_name, airtable_time(started - OVERLAP))
+    metrics.inc("mirror_records_synced_total", pulled, table=table_name)
+    print(f"mirror {table_name}: {pulled} records " + ("pulled" if since is None else f"changed since {since}"))
+    return pulled
+
+
+async def sync_mirror(store:MirrorStore, session:ClientSession, tables:list[str]=TABLES, full:bool=False) -> dict:
+    """ syncs the tables at the same time, returns { table: records pulled } """
+    pulled = await asyncio.gather(*[sync_mirror_table(store, session, name, full) for name in tables])
+    return dict(zip(tables, pulled))
+
+
+# Airtable accepts at most 10 records in a single PATCH / POST
+BATCH_SIZE:Final = 10
+MAX_WORKERS:Final = 4
+# the statuses of a batch rejected because of some of its records ( invalid field, unknown record id )
+RECORD_ERRORS:Final = (400, 404, 422)
+
+async def send_batch(session:ClientSession, method:str, table_name:str, records:list[dict], keys:list[str],
+                     options:dict|None=None, max_retries=3) -> dict:
+    """ sends up to BATCH_SIZE records ( [{"id": .., "fields": {..}}], no id for a POST ) in one request.
+        keys[i] names records[i] in the report, returns { key: True/False }.
+        only 429, 5xx and network errors are retried. a batch rejected because of its records ( see RECORD_ERRORS )
+        is split in halves until the bad records are alone, so they don't fail the rest of the batch
+    """
+    url = f"{AIRTABLE_API_URL}/{AIRTABLE_BASE_ID}/{table_name}"
+    payload = dict(options or {})
+    payload["records"] = records
+    report = {k: False for k in keys}
+    
+    for attempt in range( 1, max_retries+1 ):
+        try:
+            async with limiter():
+                with metrics.timer("airtable_request", method=method, endpoint=table_name):
+                    async with session.request(method, url, headers=HEADERS, json=payload) as response:
+                        limiter().record(response.status, response.headers.get("Retry-After"))
+                        if response.status == 200:
+                            body = await response.json()
+                            # airtable echoes the written records back, in the order they were sent
+                            for k, _ in zip(keys, body.get("records", [])):
+                                report[k] = True
+                            metrics.inc("airtable_records_written_total", len(body.get("records", [])), method=method, endpoint=table_name)
+                            return report
+                        status = response.status
+                        body = await response.text()
+                        print(f"Attempt {attempt}: Failed ({status}) - {body}")
+        except Exception as e:
+            limiter().record(None)
+            print(f"Attempt {attempt} failed with {e}")
+            status = None
+        
+        if status is not None and status != 429 and status < 500:
+            # not retryable, the same request would fail again
+            metrics.inc("airtable_rejected_total", method=method, endpoint=table_name, status=status)
+            if status in RECORD_ERRORS and len(records) > 1:
+                half = len(records) // 2
+                report.update(await send_batch(session, method, table_name, records[:half], keys[:half], options, max_retries))
+                report.update(await send_batch(session, method, table_name, records[half:], keys[half:], options, max_retries))
+            return report
+        
+        if attempt == max_retries:
+            break
+        metrics.inc("airtable_retries_total", method=method, endpoint=table_name)
+        wait_time = limiter().backoff(attempt)
+        print(f"Retrying in {wait_time:.1f} seconds...")
+        await asyncio.sleep(wait_time)
+        
+    return report
+
+
+async def patch_batch(session:ClientSession, table_name:str, records:list[dict], max_retries=3) -> dict:
+    """ PATCH up to BATCH_SIZE records ( [{"id": .., "fields": {..}}] ) in one request.
+        returns { recordId: True/False }
+    """
+    return await send_batch(session, "PATCH", table_name, records, [record["id"] for record in records], 
+                            max_retries=max_retries)
+
+
+async def batch_write_records(table_name:str, method:str, records:dict,
+                              session:ClientSession|None=None, options:dict|None=None,
+                              workers:int=MAX_WORKERS, max_retries=3,
+                              on_report:Callable[[dict], None]|None=None) -> dict:
+    """ bulk writer, records = { key: {"id": .., "fields": {..}} }
+        records are grouped in batches of BATCH_SIZE and a bounded number of workers 
+        send the batches at the same time over one shared session.
+        on_report is called with the report of every batch as soon as it is sent.
+        returns { key: True/False }
+    """
+    if session is None:
+        async with create_session(limit=workers) as session:
+            return await batch_write_records(table_name, method, records, session, options, workers, max_retries, on_report)
+
+    items = list(records.items())
+    queue:asyncio.Queue = asyncio.Queue()
+    for i in range(0, len(items), BATCH_SIZE):
+        queue.put_nowait(items[i:i+BATCH_SIZE])
+    
+    report = {}
+    
+    async def worker():
+        while not queue.empty():
+            batch = queue.get_nowait()
+            keys = [k for k, _ in batch]
+            batch_report = await send_batch(session, method, table_name, [r for _, r in batch], keys, options, max_retries)
+            if on_report is not None:
+                on_report(batch_report)
+            report.update(batch_report)
+
+    await asyncio.gather(*[worker() for _ in range(max(1, workers))])
+    return report
+
+
+async def batch_update_records(table_name:str, updates:dict, 
+                               session:ClientSession|None=None, 
+                               workers:int=MAX_WORKERS, max_retries=3,
+                               on_report:Callable[[dict], None]|None=None) -> dict:
+    """ bulk PATCH, updates = { recordId: fields }, returns { recordId: True/False } """
+    records = {k: {"id": k, "fields": v} for k, v in updates.items()}
+    return await batch_write_records(table_name, "PATCH", records, session, workers=workers, max_retries=max_retries,
+                                     on_report=on_report)
+
+
+async def batch_create_records(table_name:str, creates:dict, 
+                               session:ClientSession|None=None, 
+                               workers:int=MAX_WORKERS, max_retries=3) -> dict:
+    """ bulk POST, creates = { key: fields }, returns { key: True/False } """
+    records = {k: {"fields": v} for k, v in creates.items()}
+    return await batch_write_records(table_name, "POST", records, session, workers=workers, max_retries=max_retries)
+
+
+def compress(data:dict) -> Tuple[str, str]:
+    """ returns the compressed json and its SHA-256, the json is canonical ( sorted keys, normalized values )
+        so the SHA only changes with the data
+    """
+    return encode_compressed_json(data, COMPACT_JSON)
+
+
+def compressed_json_fields(data:dict) -> dict:
+    compressed_json, sha256_hash = compress(data)
+    
+    return {
+        "Compressed_JSON": compressed_json,
+        "Shortlist_status": "Pending",
+        "SHA": sha256_hash,
+        "LLM_Summary": "",
+        "LLM_Score": 0,
+        "Follow_Ups": ""   
+    }
+
+
+@metrics.timed("stage", stage="update_compressed_json")
+async def  update_compressed_json(recordId:str, data:dict, max_retries=3) -> bool:
+    
+    report = await batch_update_records("Applicants", {recordId: compressed_json_fields(data)}, max_retries=max_retries)
+    return report[recordId]
+
+
+async def fetch_stored_hashes(session:ClientSession, store:MirrorStore|None=None) -> dict:
+    """ reads back only the SHA field of the Applicants table ( from the store when given ), returns { recordId: sha } """
+    if store is not None:
+        return {r["id"]: r["fields"]["SHA"] for r in store.records(APPLICANTS) if r["fields"].get("SHA")}
+    
+    hashes = {}
+    async for record in fetch_records_stream(session, "Applicants", {"fields[]": "SHA"}):
+        sha = record["fields"].get("SHA")
+        if sha:
+            hashes[record["id"]] = sha
+    return hashes
+
+
+def changed_applicants(combined_data:dict, stored_hashes:dict) -> dict:
+    """ keeps only the applicants whose compressed json no longer matches the stored SHA """
+    return {k: v for k, v in combined_data.items() if compress(v)[1] != stored_hashes.get(k)}
+
+
+@metrics.timed("stage", stage="update_compressed_json_bulk")
+async def update_compressed_json_bulk(combined_data:dict, session:ClientSession|None=None, 
+                                      max_retries=3, incremental:bool=False, 
+                                      journal:Journal|None=None, store:MirrorStore|None=None) -> dict:
+    """ updates the Compressed_JSON of all the applicants, returns { recordId: True/False }
+        in incremental mode the unchanged applicants are skipped, so their LLM fields are kept.
+        with a journal, the applicants already written with the same SHA are skipped and the new writes are logged.
+        with a store, the stored SHAs are read from the mirror ( synced before ) instead of the api
+    """
+    if session is None:
+        async with create_session() as session:
+            return await update_compressed_json_bulk(combined_data, session, max_retries, incremental, journal, store)
+    
+    if incremental:
+        stored_hashes = await fetch_stored_hashes(session, store)
+        changed = changed_applicants(combined_data, stored_hashes)
+        print(f"{len(changed)} of {len(combined_data)} applicants changed")
+        combined_data = changed
+        
+    updates = {k: compressed_json_fields(v) for k, v in combined_data.items()}
     
-    for x in salary_data:
-        if "Preferred Rate" in x:
-            #print(f"salary = {x}")
-            filtered = { k:x[k] for k in SALARY_KEYS if k in x}
-            applicant = x["Applicants"][0]
-            y = data[applicant]
-            y["salary"] = filtered
+    on_report = None
+    if journal is not None:
+        updates = {k: v for k, v in updates.items() if not journal.done(k, JOURNAL_STAGE, v["SHA"])}
+        
+        def on_report(report:dict):
+            for k, ok in report.items():
+                journal.record(k, JOURNAL_STAGE, updates[k]["SHA"], OK if ok else FAILED)
     
-    return data
+    return await batch_update_records("Applicants", updates, session, max_retries=max_retries, on_report=on_report)
+
+        
 
-async def main():
+
+def combine_data(personal_data:list, experience_data:list, salary_data:list ) -> dict:
+    rows = itertools.chain(
+        ((PERSONAL, x) for x in personal_data),
+        ((EXPERIENCE, x) for x in experience_data),
+        ((SALARY, x) for x in salary_data),
+    )
+    return join_rows(rows)
+
+
+def combine_from_store(store:MirrorStore) -> dict:
+    """ combine_data over the mirrored tables, no api call """
+    return combine_data(store.fields(PERSONAL), store.fields(EXPERIENCE), store.fields(SALARY))
+
+
+async def combine_stream(session:ClientSession) -> AsyncIterator[Tuple[str, dict]]:
+    """ fetches the three tables and yields ( applicant, combined data ) as soon as an applicant is complete """
+    rows = fetch_tables_stream(session, [PERSONAL, EXPERIENCE, SALARY], end_markers=True)
+    async for rec in join_stream(rows):
+        yield rec.applicant, rec.to_dict()
+
+JOURNAL_FILE:Final = ".journal_airtable_json_update.jsonl"
+JOURNAL_STAGE:Final = "compressed_json"
+
+async def main(incremental:bool=True, resume:bool=False, mirror:bool=False, full_sync:bool=False):
     """_summary_
     Following three things are done by the script,
     1. Fetch the data from Salary, Personal and Experience tables
     2. Organize the data as per Applicant ID
     3. Created a compressed JSON and update the Applicants table 
+       ( only the applicants whose SHA changed, unless incremental is False )
+    with resume, the applicants written by an interrupted run are skipped ( see JOURNAL_FILE )
+    with mirror, only the records changed since the last run are fetched into the local mirror ( see mirror_store.py ),
+    full_sync reads the tables again and drops the deleted records from the mirror
     """
     
-    # Fetch data
-    personal_data = fetch_data_from_airtable("Personal_Details")
-    experience_data = fetch_data_from_airtable("Work_Experience")
-    salary_data = fetch_data_from_airtable("Salary_Prefs")
-
-    # Combine data
-    combined_data = combine_data(personal_data,experience_data, salary_data)
+    async with create_session() as session:
+        store = None
+        if mirror:
+            store = MirrorStore()
+            await sync_mirror(store, session, [APPLICANTS, PERSONAL, EXPERIENCE, SALARY], full=full_sync)
+            combined_data = combine_from_store(store)
+        else:
+            # Fetch and combine data, all three tables at the same time
+            combined_data = {}
+            async for applicant, data in combine_stream(session):
+                combined_data[applicant] = data
     
-    # Update Applicants with Compressed_JSON
-    for x in combined_data.keys():
-        result = await update_compressed_json(x ,combined_data[x])
+        # Update Applicants with Compressed_JSON
+        try:
+            with Journal(JOURNAL_FILE, resume) as journal:
+                report = await update_compressed_json_bulk(combined_data, session, incremental=incremental, 
+                                                           journal=journal, store=store)
+                if journal.skipped:
+                    print(f"{journal.skipped} applicants already written by the previous run")
+        finally:
+            if store is not None:
+                store.close()
+        
+    for x, result in report.items():
         if result == False:
             print(f"update to {x} failed")
         else:
             print(f"update to {x} Succeeded")
     
+    metrics.dump_if_configured()
+    
 ##
 ## To run the script it equires a .env file with following two values
 ## AIRTABLE_API_TOKEN , AIRTABLE_BASE_ID 
+## pass --full to rewrite every applicant, even the unchanged ones
+## pass --resume to continue an interrupted run
+## pass --mirror to read the tables from the local mirror, synced with the records changed since the last run
+## pass --full-sync with --mirror to read the whole tables into the mirror, the deleted records are dropped
+## set METRICS_FILE to dump the metrics of the run ( .prom or .json )
 ##
 if __name__ == "__main__":
     init()
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(incremental="--full" not in sys.argv, resume="--resume" in sys.argv, mirror="--mirror" in sys.argv,
+                     full_sync="--full-sync" in sys.argv))
\ No newline at end of file
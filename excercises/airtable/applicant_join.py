@@ -0,0 +1,149 @@
+from typing import AsyncIterator, Final, Iterable, Tuple
+
+PERSONAL_KEYS:Final = ["Full Name", "Email", "Location", "LinkedIn"]
+EXPERIENCE_KEYS:Final = ["Company", "Title", "Start", "End", "Technologies"]
+SALARY_KEYS:Final = ["Preferred Rate","Minimum_Rate", "Currency", "Availability"]
+
+PERSONAL:Final = "Personal_Details"
+EXPERIENCE:Final = "Work_Experience"
+SALARY:Final = "Salary_Prefs"
+
+# marks a key that is not present in the row, None is a valid airtable value
+_MISSING:Final = object()
+
+
+def _pack(row:dict, keys:list) -> tuple:
+    return tuple(row.get(k, _MISSING) for k in keys)
+
+
+def _unpack(values:tuple, keys:list) -> dict:
+    return {k: v for k, v in zip(keys, values) if v is not _MISSING}
+
+
+class ApplicantRecord:
+    """ compact record of one applicant, the rows are kept as tuples aligned to the *_KEYS lists """
+    __slots__ = ("applicant", "personal", "experience", "salary")
+
+    def __init__(self, applicant:str) -> None:
+        self.applicant = applicant
+        self.personal:tuple|None = None
+        self.experience:list[tuple] = []
+        self.salary:tuple|None = None
+
+    def to_dict(self) -> dict:
+        """ same shape ( and key order ) as the original combine_data output """
+        data:dict = {}
+        if self.personal is not None:
+            data["personal"] = _unpack(self.personal, PERSONAL_KEYS)
+        if self.experience:
+            data["experience"] = [_unpack(x, EXPERIENCE_KEYS) for x in self.experience]
+        if self.salary is not None:
+            data["salary"] = _unpack(self.salary, SALARY_KEYS)
+        return data
+
+
+class ApplicantJoin:
+    """ streaming join of the Personal_Details, Work_Experience and Salary_Prefs rows on the Applicants link.
+
+        rows can arrive in any order. an applicant is emitted as soon as its personal and salary rows
+        are in and the Work_Experience table is done: the Applicants table has no count of the experience
+        rows, so only the end of that table tells that an applicant has no more of them.
+        the applicants still without a personal row at the end are orphans and are dropped.
+    """
+
+    def __init__(self) -> None:
+        self.pending:dict = {}
+        self.done_tables:set = set()
+        self.orphans = 0
+
+    def _record(self, applicant:str) -> ApplicantRecord:
+        rec = self.pending.get(applicant)
+        if rec is None:
+            rec = ApplicantRecord(applicant)
+            self.pending[applicant] = rec
+        return rec
+
+    def _is_complete(self, rec:ApplicantRecord) -> bool:
+        if rec.personal is None:
+            return False
+        if rec.salary is None and SALARY not in self.done_tables:
+            return False
+        return EXPERIENCE in self.done_tables
+
+    def _emit(self, rec:ApplicantRecord) -> list:
+        if self._is_complete(rec):
+            del self.pending[rec.applicant]
+            return [rec]
+        return []
+
+    def add(self, table_name:str, row:dict) -> list:
+        """ adds one row, returns the applicants that became complete """
+        links = row.get("Applicants")
+        if not links:
+            return []
+
+        if table_name == PERSONAL:
+            if "Email" not in row:
+                return []
+            rec = self._record(links[0])
+            rec.personal = _pack(row, PERSONAL_KEYS)
+        elif table_name == EXPERIENCE:
+            if "Company" not in row:
+                return []
+            rec = self._record(links[0])
+            rec.experience.append(_pack(row, EXPERIENCE_KEYS))
+        elif table_name == SALARY:
+            if "Preferred Rate" not in row:
+                return []
+            rec = self._record(links[0])
+            rec.salary = _pack(row, SALARY_KEYS)
+        else:
+            raise ValueError(f"unknown table {table_name}")
+
+        return self._emit(rec)
+
+    def table_done(self, table_name:str) -> list:
+        """ marks the table as fully read, returns the applicants that became complete """
+        self.done_tables.add(table_name)
+        finished = []
+        for rec in list(self.pending.values()):
+            finished.extend(self._emit(rec))
+        return finished
+
+    def finish(self) -> list:
+        """ all the tables are read, flushes the remaining applicants.
+            applicants without a personal row can't be combined and are dropped
+        """
+        finished = []
+        for table_name in (PERSONAL, EXPERIENCE, SALARY):
+            if table_name not in self.done_tables:
+                finished.extend(self.table_done(table_name))
+        self.orphans += len(self.pending)
+        self.pending.clear()
+        return finished
+
+
+def join_rows(rows:Iterable[Tuple[str, dict]]) -> dict:
+    """ blocking join, rows = ( table_name, fields ). returns { applicant: dict } """
+    join = ApplicantJoin()
+    data = {}
+    for table_name, row in rows:
+        for rec in join.add(table_name, row):
+            data[rec.applicant] = rec.to_dict()
+    for rec in join.finish():
+        data[rec.applicant] = rec.to_dict()
+    return data
+
+
+async def join_stream(rows:AsyncIterator[Tuple[str, dict|None]]) -> AsyncIterator[ApplicantRecord]:
+    """ streaming join, yields every applicant as soon as it is complete.
+        rows = ( table_name, fields ), fields None marks the end of the table
+        ( see fetch_tables_stream(end_markers=True) )
+    """
+    join = ApplicantJoin()
+    async for table_name, row in rows:
+        finished = join.table_done(table_name) if row is None else join.add(table_name, row)
+        for rec in finished:
+            yield rec
+    for rec in join.finish():
+        yield rec
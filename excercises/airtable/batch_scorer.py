@@ -0,0 +1,158 @@
+import numpy as np
+from typing import Dict, Final, Tuple
+
+from compressed_json import decode_compressed_json
+from shortlist_rules import DEFAULT_PROFILE, Ruleset, experience_reason, get_ruleset
+
+DAYS_PER_YEAR:Final = 365.0
+
+
+class ExperienceColumns:
+    """ the experience of a batch of applicants flattened into columnar arrays, one entry per job """
+
+    def __init__(self, records:list[dict]) -> None:
+        applicant, starts, ends, companies = [], [], [], []
+        for i, record in enumerate(records):
+            for job in record.get("experience", []):
+                applicant.append(i)
+                starts.append(job.get("Start"))
+                ends.append(job.get("End"))
+                companies.append(job.get("Company"))
+
+        self.size = len(records)
+        self.applicant = np.array(applicant, dtype=np.int64)
+        self.start = parse_dates(starts)
+        self.end = parse_dates(ends)
+
+        # companies are stored as codes, the names are looked up once per distinct company
+        self.company_names, self.company = np.unique(np.array(companies, dtype=object).astype(str), return_inverse=True) \
+            if companies else (np.array([], dtype=str), np.array([], dtype=np.int64))
+
+
+def parse_dates(values:list) -> np.ndarray:
+    """ "%Y-%m-%d" strings to datetime64[D], missing or malformed dates become NaT """
+    try:
+        return np.array([v if isinstance(v, str) else "NaT" for v in values], dtype="datetime64[D]")
+    except ValueError:
+        pass
+    out = np.empty(len(values), dtype="datetime64[D]")
+    for i, v in enumerate(values):
+        try:
+            out[i] = np.datetime64(v, "D") if isinstance(v, str) else np.datetime64("NaT")
+        except ValueError:
+            out[i] = np.datetime64("NaT")
+    return out
+
+
+def experience_years(cols:ExperienceColumns, merge_overlaps:bool=False) -> np.ndarray:
+    """ years of experience per applicant, the sum of the job durations like calculate_experience_years.
+        with merge_overlaps, concurrent jobs are counted once ( the union of the job intervals ), so the
+        years and the shortlist can differ from extract_filter_evaluate.filter
+    """
+    valid = ~(np.isnat(cols.start) | np.isnat(cols.end))
+    applicant = cols.applicant[valid]
+    start = cols.start[valid].astype(np.int64)
+    end = cols.end[valid].astype(np.int64)
+
+    if not merge_overlaps:
+        days = np.bincount(applicant, weights=end - start, minlength=cols.size)
+        return days / DAYS_PER_YEAR
+
+    if len(start) == 0:
+        return np.zeros(cols.size)
+
+    end = np.maximum(end, start)
+    order = np.lexsort((start, applicant))
+    applicant, start, end = applicant[order], start[order], end[order]
+
+    # shift every applicant into its own range of days, so a single running maximum
+    # gives the furthest end date seen so far within each applicant
+    span = int(end.max() - end.min()) + 1
+    offset = applicant * span
+    reach = np.maximum.accumulate(end + offset) - offset
+
+    # the reach before each job, the first job of an applicant starts fresh
+    previous = np.empty_like(reach)
+    previous[0] = start[0]
+    previous[1:] = reach[:-1]
+    first = np.ones(len(applicant), dtype=bool)
+    first[1:] = applicant[1:] != applicant[:-1]
+    previous[first] = start[first]
+
+    covered = np.clip(end - np.maximum(start, previous), 0, None)
+    days = np.bincount(applicant, weights=covered, minlength=cols.size)
+    return days / DAYS_PER_YEAR
+
+
+def tier1_membership(cols:ExperienceColumns, tier1_companies:list) -> np.ndarray:
+    """ True for the applicants that worked in at least one tier 1 company """
+    is_tier1 = np.isin(cols.company_names, list(tier1_companies))[cols.company]
+    return np.bincount(cols.applicant, weights=is_tier1, minlength=cols.size) > 0
+
+
+def score_batch(records:list[dict], ruleset:Ruleset, merge_overlaps:bool=False) -> Dict[str, np.ndarray]:
+    """ evaluates every rule of the ruleset for the whole batch at once,
+        returns one boolean array per rule, "valid" and the experience "years"
+    """
+    n = len(records)
+    cols = ExperienceColumns(records)
+    years = experience_years(cols, merge_overlaps)
+    scores = {"years": years, "valid": np.ones(n, dtype=bool)}
+
+    salary = [record.get("salary", {}) for record in records]
+
+    for rule in ruleset.rules:
+        params = rule.params
+        if rule.name == "experience":
+            has_years = years >= params.get("min_years", 4)
+            has_tier1 = tier1_membership(cols, params.get("tier1_companies") or [])
+            scores["has_years"], scores["has_tier1"] = has_years, has_tier1
+            ok = has_years | has_tier1
+        elif rule.name == "max_rate":
+            rate = np.array([s.get("Preferred Rate", np.inf) for s in salary], dtype=float)
+            ok = rate <= params["value"]
+        elif rule.name == "min_availability":
+            availability = np.array([s.get("Availability", 0) for s in salary], dtype=float)
+            ok = availability >= params["value"]
+        elif rule.name == "location":
+            locations = np.array([str(record.get("personal", {}).get("Location", "")) for record in records], dtype=object)
+            ok = np.isin(locations, list(params["allowed"]))
+        else:
+            # no vectorized version, falls back to the compiled check
+            ok = np.fromiter((rule.check(record) for record in records), dtype=bool, count=n)
+
+        # like the short-circuit ruleset, a rule only counts the applicants still valid when it runs
+        rule.rejections += int(np.count_nonzero(~ok & scores["valid"]))
+        scores[rule.name] = ok
+        scores["valid"] &= ok
+
+    return scores
+
+
+def batch_reason(ruleset:Ruleset, record:dict, scores:dict, i:int) -> str:
+    parts = []
+    for rule in ruleset.rules:
+        if rule.name == "experience":
+            parts.append(experience_reason(rule.params.get("min_years", 4), bool(scores["has_years"][i]), bool(scores["has_tier1"][i])))
+        else:
+            parts.append(rule.describe(record))
+    return "Applicant has " + "".join(parts)
+
+
+def filter_batch(data:dict, profile:str=DEFAULT_PROFILE, merge_overlaps:bool=False) -> Tuple[Dict, Dict]:
+    """ same result as extract_filter_evaluate.filter, scored for the whole batch at once.
+        merge_overlaps counts concurrent jobs once, see experience_years
+    """
+    ruleset = get_ruleset(profile)
+    keys = list(data.keys())
+    records = [decode_compressed_json(data[k].get("Compressed_JSON"), data[k].get("SHA")) for k in keys]
+    scores = score_batch(records, ruleset, merge_overlaps)
+
+    filtered = {}
+    rejected = {}
+    for i, k in enumerate(keys):
+        if scores["valid"][i]:
+            filtered[k] = {"compressed": data[k], "score_reason": batch_reason(ruleset, records[i], scores, i)}
+        else:
+            rejected[k] = data[k]
+    return filtered, rejected
@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import socket
+import time
+
+from google import genai
+
+import airtable_json_update
+import extract_filter_evaluate
+import rate_limiter
+from standin_server import FaultConfig, StandinState, start
+
+# runs both pipelines against the local stand-in server and reports the throughput.
+#   python excercises/airtable/benchmark.py --sizes 1000 10000 --latency 0.05 --rate-429 0.01
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def configure(port:int, rate:float, concurrency:int):
+    """ points both scripts to the stand-in, the limiter is relaxed to the given rate """
+    airtable_json_update.AIRTABLE_BASE_ID = "appBenchmark"
+    airtable_json_update.AIRTABLE_API_URL = f"http://127.0.0.1:{port}/v0"
+    airtable_json_update.HEADERS = {"Authorization": "Bearer benchmark", "Content-Type": "application/json"}
+    rate_limiter._limiters[airtable_json_update.AIRTABLE_BASE_ID] = rate_limiter.AdaptiveLimiter(
+        rate=rate, burst=max(1, int(rate)), max_concurrency=concurrency)
+    extract_filter_evaluate.client = genai.Client(api_key="benchmark", http_options={"base_url": f"http://127.0.0.1:{port}"})
+
+
+async def run_json_update() -> int:
+    async with airtable_json_update.create_session() as session:
+        combined = {}
+        async for applicant, data in airtable_json_update.combine_stream(session):
+            combined[applicant] = data
+        report = await airtable_json_update.update_compressed_json_bulk(combined, session)
+    return sum(1 for ok in report.values() if ok)
+
+
+async def run_evaluate() -> int:
+    counts = await extract_filter_evaluate.run_pipeline()
+    return counts["updated"]
+
+
+async def measure(name:str, n:int, faults:FaultConfig, args) -> dict:
+    state = StandinState()
+    state.seed(n)
+    port = free_port()
+    configure(port, args.rate, args.concurrency)
+    runner = await start(state, faults, port=port)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext():
+            if name == "evaluate":
+                # the second pipeline starts from the output of the first one
+                await run_json_update()
+                state.requests.clear()
+                state.throttled = 0
+
+            started = time.perf_counter()
+            records = await (run_evaluate() if name == "evaluate" else run_json_update())
+            elapsed = time.perf_counter() - started
+    finally:
+        await runner.cleanup()
+
+    stats = state.stats()
+    return {
+        "pipeline": name,
+        "applicants": n,
+        "records": records,
+        "seconds": round(elapsed, 3),
+        "records_per_second": round(records / elapsed, 1) if elapsed > 0 else None,
+        "requests": stats["total_requests"],
+        "throttled": stats["throttled"],
+        "requests_by_endpoint": stats["requests"],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="throughput of the airtable pipelines against the stand-in server")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--pipelines", nargs="+", default=["json_update", "evaluate"])
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, default=1000.0, help="requests per second allowed by the limiter")
+    parser.add_argument("--concurrency", type=int, default=20, help="max requests in flight")
+    parser.add_argument("--output", help="writes the results as json")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        for name in args.pipelines:
+            faults = FaultConfig(args.latency, args.jitter, args.rate_429, args.retry_after, args.page_size, args.llm_latency)
+            result = await measure(name, n, faults, args)
+            results.append(result)
+            print(f"{name:12} {n:>8} applicants {result['seconds']:>9}s {result['records_per_second']:>10} rec/s "
+                  f"{result['requests']:>7} requests {result['throttled']:>5} throttled")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
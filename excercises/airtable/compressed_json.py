@@ -0,0 +1,164 @@
+import base64
+import binascii
+import hashlib
+import json
+import re
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Final, Tuple
+
+# orjson is a lot faster than the json module, but it is optional
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+CACHE_SIZE:Final = 4096
+# version 1 of the compact encoding: zlib deflate wrapped in base64. plain json starts with "{"
+COMPACT_PREFIX:Final = "z1:"
+ZLIB_LEVEL:Final = 9
+# "2020-01-05T00:00:00.000Z" and friends, the way airtable returns a date time field
+ISO_DATETIME:Final = re.compile(r"^(\d{4}-\d{2}-\d{2})T(\d{2}:\d{2}:\d{2})(\.\d+)?(Z|[+-]00:00)$")
+
+
+def _normalize_datetime(value:datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return _normalize_string(value.isoformat(timespec="milliseconds") + "Z")
+
+
+def _normalize_string(value:str) -> str:
+    m = ISO_DATETIME.match(value)
+    if m is None:
+        return value
+    if m.group(2) == "00:00:00" and not (m.group(3) or "").strip(".0"):
+        return m.group(1)
+    millis = (m.group(3) or "").rstrip("0")
+    return f"{m.group(1)}T{m.group(2)}{millis if millis != '.' else ''}Z"
+
+
+def normalize(value):
+    """ the canonical form of a payload value: integral floats become ints ( 5.0 -> 5 ), decimals numbers,
+        dates and UTC date times one ISO 8601 spelling ( a midnight date time is its date )
+    """
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, Decimal):
+        value = float(value) if value != value.to_integral_value() else int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, datetime):
+        return _normalize_datetime(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str):
+        return _normalize_string(value)
+    return value
+
+
+def canonical_json(data) -> str:
+    """ sorted keys, no spaces, normalized values: the same data always gives the same text ( and SHA ) """
+    return json.dumps(normalize(data), sort_keys=True, separators=(',', ':'), ensure_ascii=False, allow_nan=False)
+
+
+def encode_compressed_json(data:dict, compact:bool=False) -> Tuple[str, str]:
+    """ ( Compressed_JSON text, SHA-256 ). the SHA is the one of the canonical json, it does not depend on compact.
+        compact zlib compresses the text, it is only used when it is shorter
+    """
+    text = canonical_json(data)
+    raw = text.encode('utf-8')
+    sha = hashlib.sha256(raw).hexdigest()
+    if compact:
+        packed = COMPACT_PREFIX + base64.b64encode(zlib.compress(raw, ZLIB_LEVEL)).decode('ascii')
+        if len(packed) < len(text):
+            return packed, sha
+    return text, sha
+
+
+def decode_text(text:str):
+    """ parses a plain or a compact Compressed_JSON, without the cache """
+    if text.startswith(COMPACT_PREFIX):
+        try:
+            return _loads(zlib.decompress(base64.b64decode(text[len(COMPACT_PREFIX):])))
+        except (zlib.error, binascii.Error) as e:
+            raise ValueError(f"invalid compact Compressed_JSON: {e}")
+    return _loads(text)
+
+
+def _content(value):
+    """ a record that carries a Compressed_JSON ( a lead, an applicant payload ) with the nested text decoded.
+        its SHA is left out, it is derived from the nested content
+    """
+    if not isinstance(value, dict) or not isinstance(value.get("Compressed_JSON"), str):
+        return value
+    try:
+        nested = decode_text(value["Compressed_JSON"])
+    except ValueError:
+        return value
+    out = {k: v for k, v in value.items() if k != "SHA"}
+    out["Compressed_JSON"] = nested
+    return out
+
+
+def content_sha(data) -> str:
+    """ the SHA of decoded data, a nested Compressed_JSON counts by its content and not by its encoding """
+    return hashlib.sha256(canonical_json(_content(data)).encode('utf-8')).hexdigest()
+
+
+def payload_sha(text:str) -> str:
+    """ the SHA of the content, the same for the plain, the compact and the old unsorted encodings of equal data,
+        at the top level and in a nested Compressed_JSON
+    """
+    return content_sha(decode_text(text))
+
+
+class DecodeCache:
+    """ LRU cache of the decoded Compressed_JSON payloads, keyed by the SHA of the payload.
+        the decoded dicts are shared between the callers, they must not be modified.
+    """
+
+    def __init__(self, maxsize:int=CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.entries:OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def decode(self, text:str, sha:str|None=None) -> dict:
+        key = sha if sha else hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+        record = self.entries.get(key)
+        if record is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return record
+
+        self.misses += 1
+        record = decode_text(text)
+        if not isinstance(record, dict):
+            raise ValueError(f"Compressed_JSON is not an object: {text[:40]}")
+
+        self.entries[key] = record
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return record
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+
+_cache = DecodeCache()
+
+def decode_compressed_json(text:str, sha:str|None=None) -> dict:
+    """ parses the Compressed_JSON field ( plain or compact ), a payload seen before is not parsed again """
+    return _cache.decode(text, sha)
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
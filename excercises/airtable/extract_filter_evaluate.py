@@ -1,12 +1,17 @@
 import hashlib
-from typing import Tuple,Dict, Final, Optional
+from typing import AsyncIterator, Tuple,Dict, Final
 
 import aiohttp
 import airtable_json_update
-import requests
-from datetime import datetime
+from compressed_json import COMPACT_PREFIX, canonical_json, decode_compressed_json, payload_sha
+from shortlist_rules import DEFAULT_PROFILE, calculate_experience_years, get_ruleset
+from llm_cache import LLMCache, cache_key
+from stages import QUEUE_SIZE, Channel, run_stage
+from journal import FAILED, OK, Journal
+from mirror_store import APPLICANTS, LEADS, MirrorStore
+import metrics
 import asyncio
-import json, os
+import json, os, sys
 from google import genai
 from google.genai.client import Client
 
@@ -17,15 +22,27 @@ def init():
     airtable_json_update.init()
 
     GEMINI_API_KEY =os.getenv("GEMINI_API_KEY")
+    # can point to a local stand-in server ( see standin_server.py )
+    GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
     global client
-    client = genai.Client(api_key=GEMINI_API_KEY)
+    if GEMINI_BASE_URL:
+        client = genai.Client(api_key=GEMINI_API_KEY, http_options={"base_url": GEMINI_BASE_URL})
+    else:
+        client = genai.Client(api_key=GEMINI_API_KEY)
     
 
-def extract():
-    url = f"https://api.airtable.com/v0/{airtable_json_update.AIRTABLE_BASE_ID}/Applicants"
-    response = requests.get(url, headers=airtable_json_update.HEADERS)
-    response.raise_for_status()
-    records = response.json().get("records", [])
+def extract(store:MirrorStore|None=None):
+    """ the Compressed_JSON of the applicants, read from the mirror when a store is given """
+    url = f"{airtable_json_update.AIRTABLE_API_URL}/{airtable_json_update.AIRTABLE_BASE_ID}/Applicants"
+    params = {"pageSize": airtable_json_update.PAGE_SIZE}
+    records = list(store.records(APPLICANTS)) if store is not None else []
+    while store is None:
+        response = airtable_json_update.airtable_request("GET", url, params=params)
+        body = response.json()
+        records.extend(body.get("records", []))
+        if not body.get("offset"):
+            break
+        params["offset"] = body["offset"]
     # Extract just the fields
     data = {}
     for record in records:
@@ -42,78 +59,27 @@ def extract():
             k = d["Application_ID"]
             v = d["Compressed_JSON"]
             j = {"Application_ID": k, "Compressed_JSON": v}
+            if "SHA" in d:
+                j["SHA"] = d["SHA"]
             result[x] = j
             
     return result
 
-# Define constants
-TIER_1_COMPANIES:Final = {"Google", "Meta", "OpenAI"}
-ALLOWED_LOCATIONS:Final = {"US", "Canada", "UK", "Germany", "India"}
-MAX_RATE:Final = 100
-MIN_AVAILABILITY:Final = 20
-
-def calculate_experience_years(experience_list):
-    total_days = 0
-    for job in experience_list:
-        try:
-            start = datetime.strptime(job["Start"], "%Y-%m-%d")
-            end = datetime.strptime(job["End"], "%Y-%m-%d")
-            total_days += (end - start).days
-        except:
-            continue
-    return total_days / 365.0  # Convert to years
-
-def is_tier_1_company(experience_list):
-    return any(job["Company"] in TIER_1_COMPANIES for job in experience_list)
-
-
-def is_valid_applicant(input):
-    
-    result:str = "Applicant has "
-    
-    record = eval(input.get("Compressed_JSON"))
-    # Experience
-    experience = record.get("experience", [])
-    years = calculate_experience_years(experience)
-    has_tier1 = is_tier_1_company(experience)
-    experience_ok = years >= 4 or has_tier1
-    
-    if years >= 4 and has_tier1:
-        result += "more than 4 years of experience and worked in tier1 company."
-    else:
-        if years >= 4:
-            result += "more than 4 years of experience."
-        if has_tier1:
-            result += "has tier 1 company experience."
-            
-    # Compensation
-    salary = record.get("salary", {})
-    rate_ok = salary.get("Preferred Rate", float('inf')) <= MAX_RATE
-    
-    if rate_ok:
-        result += f" Rate is less than {MAX_RATE}."
-        
-    availability_ok = salary.get("Availability", 0) >= MIN_AVAILABILITY
-    
-    if availability_ok:
-        result += f" Availability is greater than {MIN_AVAILABILITY} hours/week"
-
-    # Location
-    location = record.get("personal", {}).get("Location", "")
-    location_ok = location in ALLOWED_LOCATIONS
-
-
-    valid = experience_ok and rate_ok and availability_ok and location_ok
-    
-    return valid, result
+# the shortlist rules are read from shortlist_rules.json
+def is_valid_applicant(input, profile:str=DEFAULT_PROFILE):
+    """ applies the shortlist rules of the profile ( see shortlist_rules.json ),
+        the reason is only built for the valid applicants
+    """
+    record = decode_compressed_json(input.get("Compressed_JSON"), input.get("SHA"))
+    return get_ruleset(profile).evaluate(record)
 
 
-def filter(data:dict) -> Tuple[Dict, Dict]:
+def filter(data:dict, profile:str=DEFAULT_PROFILE) -> Tuple[Dict, Dict]:
     filtered = {}
     rejected = {}
     
     for k in data.keys():
-        v,s = is_valid_applicant( data[k])
+        v,s = is_valid_applicant( data[k], profile)
         if v :
             #print(f"s = {s}")
             temp =  {"compressed": data[k], "score_reason": s}
@@ -124,7 +90,17 @@ def filter(data:dict) -> Tuple[Dict, Dict]:
     return filtered, rejected
         
 
+def prompt_payload(applicant_data: dict) -> dict:
+    """ the llm gets a compact Compressed_JSON as the plain json text, and no SHA """
+    payload = {k: v for k, v in applicant_data.items() if k != "SHA"}
+    text = payload.get("Compressed_JSON")
+    if isinstance(text, str) and text.startswith(COMPACT_PREFIX):
+        payload["Compressed_JSON"] = canonical_json(decode_compressed_json(text, applicant_data.get("SHA")))
+    return payload
+
+
 def format_prompt(applicant_data: dict) -> str:
+    applicant_data = prompt_payload(applicant_data)
     return f"""
             You are a recruiting analyst. Given this JSON applicant profile, do four things:
             1. Provide a concise 75-word summary.
@@ -146,196 +122,594 @@ def format_prompt(applicant_data: dict) -> str:
             {json.dumps(applicant_data, indent=2)}
             """
 
+LLM_MODEL:Final = "gemini-2.5-flash"
+LLM_CONCURRENCY:Final = 8
+LLM_TIMEOUT:Final = 60
+LLM_KEYS:Final = ("Summary", "Score", "Follow-Ups")
+
+async def generate_content(prompt:str, timeout:float=LLM_TIMEOUT) -> str:
+    """ uses the async gemini client, the blocking one is moved to a worker thread when aio is not available """
+    if hasattr(client, "aio"):
+        call = client.aio.models.generate_content(model=LLM_MODEL, contents=prompt)
+    else:
+        call = asyncio.to_thread(client.models.generate_content, model=LLM_MODEL, contents=prompt)
+    with metrics.timer("llm_request", model=LLM_MODEL):
+        response = await asyncio.wait_for(call, timeout=timeout)
+    metrics.inc("llm_prompt_chars_total", len(prompt), model=LLM_MODEL)
+    return response.text
+
+
+def parse_llm_output(text:str) -> dict:
+    """ the model sometimes wraps the json in markdown fences, despite the prompt """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[len("json"):]
+    parsed = json.loads(text)
+    if not isinstance(parsed, dict) or any(k not in parsed for k in LLM_KEYS):
+        raise ValueError(f"llm output is missing one of {LLM_KEYS}")
+    return parsed
+
+
+@metrics.timed("stage", stage="analyze_applicant")
 async def analyze_applicant(applicant_id: int, applicant_data: dict) -> tuple:
     prompt = format_prompt(applicant_data)
     try:
-        response = client.models.generate_content(model="gemini-2.5-flash", contents=prompt)
-        return (applicant_id, response.text)
+        text = await generate_content(prompt)
+        return (applicant_id, text)
     except Exception as e:
         return (applicant_id, f"Error: {str(e)}")
+
+
+async def analyze_applicant_json(applicant_id, applicant_data:dict, max_retries=3) -> tuple:
+    """ returns ( applicant_id, parsed llm output ), the output is None when every attempt failed.
+        timeouts, errors and malformed json are retried
+    """
+    prompt = format_prompt(applicant_data)
+    for attempt in range( 1, max_retries+1 ):
+        try:
+            text = await generate_content(prompt)
+            return (applicant_id, parse_llm_output(text))
+        except Exception as e:
+            metrics.inc("llm_retries_total", model=LLM_MODEL)
+            print(f"llm attempt {attempt} for {applicant_id} failed with {e!r}")
+        if attempt < max_retries:
+            await asyncio.sleep(2 ** attempt)
+    return (applicant_id, None)
+
+
+# the prompt without the applicant, a change of the template invalidates the cached outputs
+PROMPT_TEMPLATE:Final = format_prompt({})
+
+# packed prompts, several applicants in one request
+BATCH_TOKENS:Final = 8000
+MAX_BATCH:Final = 20
+CHARS_PER_TOKEN:Final = 4
+
+def format_batch_prompt(applicants: list[dict]) -> str:
+    """ the instructions are sent once for all the applicants, the profiles are compact json """
+    profiles = "\n".join(json.dumps(prompt_payload(x), separators=(',', ':')) for x in applicants)
+    return f"""
+            You are a recruiting analyst. For EACH applicant profile below ( one JSON object per line ), do four things:
+            1. Provide a concise 75-word summary.
+            2. Rate overall candidate quality from 1-10 (higher is better).
+            3. List any data gaps or inconsistencies you notice.
+            4. Suggest up to three follow-up questions to clarify gaps.
+
+            Respond ONLY with a **valid JSON array**, one object per applicant, with exactly these keys:
+            "Application_ID": <the Application_ID of the profile>
+            "Summary": <text>
+            "Score": <integer>
+            "Issues": <comma-separated list or 'None'>
+            "Follow-Ups": <list of questions>
+            
+            Do NOT include markdown formatting like ```json.
+            Do NOT include any explanations or extra text.
+
+            Applicant profiles:
+            {profiles}
+            """
+
+# the packed prompt without the applicants, the outputs of a batch are cached under this template
+BATCH_PROMPT_TEMPLATE:Final = format_batch_prompt([])
+
+def cache_lookup(cache:LLMCache, applicant_data:dict) -> dict|None:
+    """ the cached output of an applicant, analysed alone or in a batch """
+    return cache.get(*(cache_key(applicant_data, template, LLM_MODEL) for template in (PROMPT_TEMPLATE, BATCH_PROMPT_TEMPLATE)))
+
+def cache_store(cache:LLMCache, batch:list[tuple], analyzed:list[tuple]) -> None:
+    """ caches the outputs of a batch under the template of the prompt that produced them """
+    template = PROMPT_TEMPLATE if len(batch) == 1 else BATCH_PROMPT_TEMPLATE
+    for (x, parsed), (_, applicant_data) in zip(analyzed, batch):
+        if parsed is not None:
+            cache.put(cache_key(applicant_data, template, LLM_MODEL), parsed)
+
+
+def estimate_tokens(text:str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def pack_batches(items:list[tuple], token_budget:int=BATCH_TOKENS, max_batch:int=MAX_BATCH) -> list[list[tuple]]:
+    """ items = ( applicant_id, applicant_data ), groups them so each prompt stays within the token budget """
+    overhead = estimate_tokens(format_batch_prompt([]))
+    batches:list = []
+    current:list = []
+    used = overhead
+    for item in items:
+        # sized like format_batch_prompt sends it, a compact Compressed_JSON goes out decoded
+        size = estimate_tokens(json.dumps(prompt_payload(item[1]), separators=(',', ':')))
+        if current and (used + size > token_budget or len(current) >= max_batch):
+            batches.append(current)
+            current, used = [], overhead
+        current.append(item)
+        used += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_llm_batch_output(text:str) -> dict:
+    """ returns { Application_ID: parsed output }, the malformed items are left out """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[len("json"):]
+    parsed = json.loads(text)
+    if not isinstance(parsed, list):
+        raise ValueError("llm output is not a json array")
+    
+    results = {}
+    for item in parsed:
+        if isinstance(item, dict) and "Application_ID" in item and all(k in item for k in LLM_KEYS):
+            results[str(item["Application_ID"])] = item
+    return results
+
+
+async def analyze_batch(batch:list[tuple]) -> list[tuple]:
+    """ analyses several applicants with one request, 
+        the applicants missing from the answer ( or malformed ) fall back to a single-applicant call
+    """
+    by_id = {str(applicant_data.get("Application_ID")): x for x, applicant_data in batch}
+    results = {}
+    if len(by_id) == len(batch) and len(batch) > 1:
+        try:
+            text = await generate_content(format_batch_prompt([applicant_data for _, applicant_data in batch]))
+            results = parse_llm_batch_output(text)
+        except Exception as e:
+            print(f"llm batch of {len(batch)} failed with {e!r}")
+    
+    out = []
+    for x, applicant_data in batch:
+        parsed = results.get(str(applicant_data.get("Application_ID")))
+        if parsed is None:
+            out.append(await analyze_applicant_json(x, applicant_data))
+        else:
+            out.append((x, parsed))
+    return out
+
+
+async def analyze_stream(data:dict, concurrency:int=LLM_CONCURRENCY, cache:LLMCache|None=None,
+                         batch_tokens:int|None=None) -> AsyncIterator[tuple]:
+    """ sends at most `concurrency` requests to the llm at the same time, 
+        yields ( applicant_id, parsed output ) in completion order.
+        with a cache, only the new or changed applicants are sent to the llm.
+        with batch_tokens, several applicants are packed in one request up to that many tokens
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = []
+    for x, rec in data.items():
+        if "compressed" not in rec:
+            continue
+        applicant_data = rec["compressed"]
+        if cache is not None:
+            cached = cache_lookup(cache, applicant_data)
+            if cached is not None:
+                yield (x, cached)
+                continue
+        pending.append((x, applicant_data))
     
+    async def bounded(batch):
+        async with semaphore:
+            if len(batch) == 1:
+                analyzed = [await analyze_applicant_json(*batch[0])]
+            else:
+                analyzed = await analyze_batch(batch)
+        if cache is not None:
+            cache_store(cache, batch, analyzed)
+        return analyzed
+    
+    batches = pack_batches(pending, batch_tokens) if batch_tokens else [[item] for item in pending]
+    tasks = [asyncio.create_task(bounded(batch)) for batch in batches]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for x, parsed in await next_done:
+                yield (x, parsed)
+    finally:
+        for task in tasks:
+            task.cancel()
     
-async def analyze(data:dict) -> dict:
-    for x in data.keys():
-        rec = data[x]
-        if "compressed" in rec:
-            y = data[x]
-            text = await analyze_applicant(x, y["compressed"])
-           
-            parsed = json.loads(text[1])
-            # print(f"llm output: {parsed}")
-            y["llm_analysis"] = parsed
     
+async def analyze(data:dict, concurrency:int=LLM_CONCURRENCY, cache:LLMCache|None=None,
+                  batch_tokens:int|None=None) -> dict:
+    async for x, parsed in analyze_stream(data, concurrency, cache, batch_tokens):
+        if parsed is None:
+            print(f"llm analysis of {x} failed")
+            continue
+        # print(f"llm output: {parsed}")
+        data[x]["llm_analysis"] = parsed
 
     return data
 
 
-async def update_applicant(status:str, 
-                           recordId:str,
+# the Applicants fields written by applicant_fields
+APPLICANT_FIELDS:Final = ("Shortlist_status", "LLM_Summary", "LLM_Score", "Follow_Ups")
+
+def applicant_fields(status:str, 
                      llm_summary:str|None=None, 
                      llm_score:int=0, 
-                     followups:str|None=None, max_retries=3 ):
-    
-    url = f"https://api.airtable.com/v0/{airtable_json_update.AIRTABLE_BASE_ID}/Applicants/{recordId}"
+                     followups:str|None=None) -> dict:
     
-    payload = {
-        "fields": {
-            "Shortlist_status": status,
-        }
+    fields = {
+        "Shortlist_status": status,
     }
     
     if llm_summary is not None:
-        payload["fields"]["LLM_Summary"] = llm_summary
+        fields["LLM_Summary"] = llm_summary
 
     if followups is not None:
-        payload["fields"]["Follow_Ups"] = followups
+        fields["Follow_Ups"] = followups
 
     # Add score only if it's meaningful (optional)
     if llm_score > 0:
-        payload["fields"]["LLM_Score"] = llm_score # type: ignore
+        fields["LLM_Score"] = llm_score # type: ignore
+        
+    return fields
+
+
+@metrics.timed("stage", stage="update_applicant")
+async def update_applicant(status:str, 
+                           recordId:str,
+                     llm_summary:str|None=None, 
+                     llm_score:int=0, 
+                     followups:str|None=None, max_retries=3 ):
     
-    async with aiohttp.ClientSession() as session:
-        for attempt in range( 1, max_retries+1 ):
-            try:
-                async with session.patch(url, headers=airtable_json_update.HEADERS, json=payload) as response:
-                    if response.status == 200:
-                        #print(f"record {recordId} updated successfully")
-                        return True
-                    else:
-                        body = await response.text()
-                        print(f"Attempt {attempt}: Failed ({response.status}) - {body}")
-            except Exception as e:
-                print(f"Attempt {attempt} failed with {e}")
-                
-            wait_time = 2 ** attempt
-            print(f"Retrying in {wait_time} seconds...")
-            await asyncio.sleep(wait_time)
-            
-        return False
+    fields = applicant_fields(status, llm_summary, llm_score, followups)
+    report = await airtable_json_update.batch_update_records("Applicants", {recordId: fields}, max_retries=max_retries)
+    return report[recordId]
 
 def compare(v1:str, v2:str):
-    
-    sha1  = hashlib.sha256(v1.encode('utf-8')).hexdigest()
-    sha2  = hashlib.sha256(v2.encode('utf-8')).hexdigest()
+    """ compares the decoded payloads, the key order and the encoding ( plain or compact ) don't matter """
+    try:
+        sha1  = payload_sha(v1)
+        sha2  = payload_sha(v2)
+    except ValueError:
+        return False
     
     if sha1 == sha2 :
         return True
     else:
         return False
     
-async def upsert_leads(recordId:str, data:dict):
-    base_id = airtable_json_update.AIRTABLE_BASE_ID
-    headers = airtable_json_update.HEADERS
-
-    application_id = data["compressed"]["Application_ID"]
-
-    print(f"Upserting lead for Application_ID: {application_id}")
-
-    # Step 1: Search for existing lead by ApplicationId (properly quoted)
-    search_url = f"https://api.airtable.com/v0/{base_id}/Leads"
-    params = {
-        "filterByFormula": f"{{Applicants}} = {application_id}",
-        "maxRecords": 1
+def lead_fields(recordId:str, data:dict) -> dict:
+    # the SHA is only carried along for the decoder cache, it is not part of the lead
+    compressed = {k: v for k, v in data["compressed"].items() if k != "SHA"}
+    return {
+        "Applicants": [recordId],  # if this is a linked field
+        "Compressed_JSON": canonical_json(compressed),
+        "Score_Reason": data["score_reason"]
     }
 
-    search_response = requests.get(search_url, headers=headers, params=params)
-    search_response.raise_for_status()
-    results = search_response.json()
 
-    if results.get("records"):
-        
-        # before updating check whether the data changed
-        fields = results["records"][0]["fields"]
-        v2 = json.dumps(data["compressed"], separators=(',', ':'))
-        isSame = compare(fields["Compressed_JSON"], v2 )
-        if isSame :
-            return True
-        
-        # Step 2: Lead exists — update it
-        lead_id = results["records"][0]["id"]
-        
-        update_url = f"https://api.airtable.com/v0/{base_id}/Leads/{lead_id}"
+@metrics.timed("stage", stage="upsert_leads")
+async def upsert_leads(recordId:str, data:dict, store:MirrorStore|None=None) -> bool:
+    """ creates or updates the lead of one applicant, the Leads are read from the mirror when there is one.
+        for more than a handful of applicants call sync_leads, it reads the Leads once for all of them
+    """
+    async with airtable_json_update.create_session() as session:
+        index = await fetch_leads_index(session, store) if store is not None else None
+        report = await sync_leads({recordId: data}, session, index=index)
+    return report[recordId]
 
-        patch_payload = {
-            "fields": {
-                "Applicants": [recordId],  # if this is a linked field
-                "Compressed_JSON": json.dumps(data["compressed"], separators=(',', ':')),
-                "Score_Reason": data["score_reason"]
-            }
-        }
 
-        patch_response = requests.patch(update_url, headers=headers, json=patch_payload)
-        patch_response.raise_for_status()
-        print(f"Updated existing Lead: {lead_id}")
-        return patch_response.json()
+async def _aiter(records) -> AsyncIterator[dict]:
+    """ the mirror records where the stages expect the async api stream """
+    for record in records:
+        yield record
 
-    else:
-        # Step 3: No existing record — create a new one
-        create_url = f"https://api.airtable.com/v0/{base_id}/Leads"
 
-        post_payload = {
-            "fields": {
-                "Applicants": [recordId],  # if this is a linked field
-                "Compressed_JSON": json.dumps(data["compressed"], separators=(',', ':')),
-                "Score_Reason": data["score_reason"]
-            }
-        }
+# used by the performUpsert mode, Leads needs a text or number field with this name
+LEADS_MERGE_FIELD:Final = "Application_ID"
 
-        post_response = requests.post(create_url, headers=headers, json=post_payload)
-        post_response.raise_for_status()
-        print("Created new Lead")
-        return post_response.json()
+async def fetch_leads_index(session:aiohttp.ClientSession, store:MirrorStore|None=None) -> dict:
+    """ reads the Leads table once ( or the mirror ), returns { Application_ID: {"id": lead recordId, "sha": sha of Compressed_JSON} } """
+    index = {}
+    records = _aiter(store.records(LEADS)) if store is not None \
+        else airtable_json_update.fetch_records_stream(session, "Leads")
+    async for record in records:
+        text = record["fields"].get("Compressed_JSON")
+        if not text:
+            continue
+        try:
+            application_id = decode_compressed_json(text).get("Application_ID")
+        except ValueError:
+            continue
+        index[str(application_id)] = {"id": record["id"], "sha": payload_sha(text)}
+    return index
 
 
+@metrics.timed("stage", stage="sync_leads")
+async def sync_leads(analyzed:dict, session:aiohttp.ClientSession|None=None, perform_upsert:bool=False,
+                     index:dict|None=None) -> dict:
+    """ bulk version of upsert_leads, returns { recordId: True/False }
+        - index mode ( default ), the Leads table is read once and only the new or changed leads are written.
+          an index fetched earlier can be passed in, it is kept up to date with the created leads
+        - perform_upsert, airtable matches the leads on LEADS_MERGE_FIELD, nothing is read but every lead is written
+    """
+    if session is None:
+        async with airtable_json_update.create_session() as session:
+            return await sync_leads(analyzed, session, perform_upsert, index)
     
+    leads = {x: lead_fields(x, data) for x, data in analyzed.items()}
+    
+    if perform_upsert:
+        records = {}
+        for x, fields in leads.items():
+            fields[LEADS_MERGE_FIELD] = analyzed[x]["compressed"]["Application_ID"]
+            records[x] = {"fields": fields}
+        options = {"performUpsert": {"fieldsToMergeOn": [LEADS_MERGE_FIELD]}}
+        return await airtable_json_update.batch_write_records("Leads", "PATCH", records, session, options)
+    
+    if index is None:
+        index = await fetch_leads_index(session)
+    report = {}
+    updates = {}
+    creates = {}
+    for x, fields in leads.items():
+        existing = index.get(str(analyzed[x]["compressed"]["Application_ID"]))
+        if existing is None:
+            creates[x] = fields
+        elif existing["id"] is None or existing["sha"] == payload_sha(fields["Compressed_JSON"]):
+            report[x] = True
+        else:
+            updates[existing["id"]] = (x, fields)
+    
+    print(f"leads: {len(creates)} new, {len(updates)} changed, {len(report)} unchanged")
+    
+    patched = await airtable_json_update.batch_update_records("Leads", {k: v[1] for k, v in updates.items()}, session)
+    for lead_id, (x, _) in updates.items():
+        report[x] = patched[lead_id]
+    created = await airtable_json_update.batch_create_records("Leads", creates, session)
+    report.update(created)
+    for x, fields in leads.items():
+        # a lead created with a fetched index is not created again by a later call
+        if created.get(x):
+            index[str(analyzed[x]["compressed"]["Application_ID"])] = {
+                "id": None, "sha": payload_sha(fields["Compressed_JSON"])}
+    return report
+
 
 async def update(analyzed:dict, rejected:dict):
     
+    updates = {}
     for x in analyzed:
+        if "llm_analysis" not in analyzed[x]:
+            # llm failed, the applicant stays Pending and is picked up by the next run
+            continue
         data = analyzed[x]["llm_analysis"]
         #print( f"data {data}")
         followups = ", ".join(data["Follow-Ups"])
-        res = await update_applicant(status="Shortlisted",recordId=x, llm_score=data["Score"], llm_summary=data["Summary"], followups=followups)
-        if res == True:
-            print(f"record {x} updated successfully")
-        else:
-            print(f"record {x} not updated successfully")
+        updates[x] = applicant_fields(status="Shortlisted", llm_score=data["Score"], llm_summary=data["Summary"], followups=followups)
             
     for x in rejected:
-        res = await update_applicant(status="Rejected", recordId=x)
+        updates[x] = applicant_fields(status="Rejected")
+        
+    report = await airtable_json_update.batch_update_records("Applicants", updates)
+    for x, res in report.items():
         if res == True:
             print(f"record {x} updated successfully")
         else:
             print(f"record {x} not updated successfully")
             
-    for x in analyzed:
-        await upsert_leads(recordId=x, data=analyzed[x])
+    leads = {x: v for x, v in analyzed.items() if "llm_analysis" in v}
+    report = await sync_leads(leads)
+    for x, res in report.items():
+        if res == False:
+            print(f"lead for {x} not updated successfully")
     
 
 
-async def main():
+async def analyze_items(items:list[tuple], cache:LLMCache|None=None, batch_tokens:int|None=None) -> list[tuple]:
+    """ items = ( applicant_id, applicant_data ), returns ( applicant_id, parsed output ) for all of them.
+        same as analyze_stream, for a handful of items that are already at hand
+    """
+    results = []
+    pending = []
+    for x, applicant_data in items:
+        cached = cache_lookup(cache, applicant_data) if cache is not None else None
+        if cached is not None:
+            results.append((x, cached))
+        else:
+            pending.append((x, applicant_data))
+    
+    batches = pack_batches(pending, batch_tokens) if batch_tokens else [[item] for item in pending]
+    for batch in batches:
+        analyzed = [await analyze_applicant_json(*batch[0])] if len(batch) == 1 else await analyze_batch(batch)
+        if cache is not None:
+            cache_store(cache, batch, analyzed)
+        results.extend(analyzed)
+    return results
+
+
+def payload_hash(compressed:dict, profile:str) -> str:
+    """ the input of an applicant for the journal, a different profile gives a different decision """
+    sha = compressed.get("SHA") or hashlib.sha256(compressed["Compressed_JSON"].encode('utf-8')).hexdigest()
+    return f"{sha}:{profile}"
+
+
+async def run_pipeline(profile:str=DEFAULT_PROFILE, cache:LLMCache|None=None, batch_tokens:int|None=BATCH_TOKENS,
+                       filter_workers:int=1, analyze_workers:int=LLM_CONCURRENCY, update_workers:int=2,
+                       queue_size:int=QUEUE_SIZE, journal:Journal|None=None, store:MirrorStore|None=None) -> dict:
+    """ extract -> filter -> analyze -> update as concurrent stages linked by bounded channels,
+        every applicant moves on as soon as the previous stage is done with it.
+        with a journal, the applicants already updated ( and their leads written ) with the same input are skipped.
+        with a store, the Applicants and the Leads are read from the mirror ( synced before ) instead of the api.
+        returns the counts of the run
+    """
+    counts = {"extracted": 0, "shortlisted": 0, "rejected": 0, "analyzed": 0, "llm_failed": 0, 
+              "updated": 0, "update_failed": 0, "unchanged": 0, "leads": 0, "resumed": 0}
+    # the status and llm fields the applicants already have. an update that would not change them is not
+    # sent, it would only bump their modified time and make the next mirror sync pull them again
+    current:dict = {}
+    
+    to_filter = Channel(queue_size)
+    to_analyze = Channel(queue_size)
+    # the update stage gets the rejected applicants from filter and the shortlisted ones from analyze
+    to_update = Channel(queue_size, producers=2)
+    # the leads stage gets the applicants from update, and from filter when only their lead is missing
+    to_leads = Channel(queue_size, producers=2)
+    
+    def done(x:str, stage:str, compressed:dict) -> bool:
+        return journal is not None and journal.done(x, stage, payload_hash(compressed, profile))
+    
+    def record(x:str, stage:str, compressed:dict, ok:bool):
+        if journal is not None:
+            journal.record(x, stage, payload_hash(compressed, profile), OK if ok else FAILED)
+    
+    async with airtable_json_update.create_session() as session:
+        leads_index = asyncio.create_task(fetch_leads_index(session, store))
+        
+        async def extract_stage():
+            records = _aiter(store.records(APPLICANTS)) if store is not None \
+                else airtable_json_update.fetch_records_stream(session, "Applicants")
+            try:
+                async for record in records:
+                    d = record["fields"]
+                    if "Compressed_JSON" in d:
+                        j = {"Application_ID": d["Application_ID"], "Compressed_JSON": d["Compressed_JSON"]}
+                        if "SHA" in d:
+                            j["SHA"] = d["SHA"]
+                        current[record["id"]] = {k: d[k] for k in APPLICANT_FIELDS if k in d}
+                        counts["extracted"] += 1
+                        await to_filter.put((record["id"], j))
+            finally:
+                await to_filter.close()
+            print(f"stage extract completed")
+        
+        async def filter_handler(items:list):
+            for x, compressed in items:
+                v, reason = is_valid_applicant(compressed, profile)
+                if v:
+                    counts["shortlisted"] += 1
+                    rec = {"compressed": compressed, "score_reason": reason}
+                    if done(x, "leads", compressed):
+                        counts["resumed"] += 1
+                    elif done(x, "update", compressed):
+                        counts["resumed"] += 1
+                        await to_leads.put((x, rec))
+                    else:
+                        await to_analyze.put((x, rec))
+                else:
+                    counts["rejected"] += 1
+                    if done(x, "update", compressed):
+                        counts["resumed"] += 1
+                    else:
+                        await to_update.put((x, {"compressed": compressed}))
+        
+        async def analyze_handler(items:list):
+            records = dict(items)
+            for x, parsed in await analyze_items([(x, rec["compressed"]) for x, rec in items], cache, batch_tokens):
+                if parsed is None:
+                    # llm failed, the applicant stays Pending and is picked up by the next run
+                    counts["llm_failed"] += 1
+                    continue
+                counts["analyzed"] += 1
+                records[x]["llm_analysis"] = parsed
+                await to_update.put((x, records[x]))
+        
+        async def update_handler(items:list):
+            updates = {}
+            for x, rec in items:
+                if "llm_analysis" not in rec:
+                    updates[x] = applicant_fields(status="Rejected")
+                else:
+                    data = rec["llm_analysis"]
+                    updates[x] = applicant_fields(status="Shortlisted", llm_score=data["Score"], llm_summary=data["Summary"], 
+                                                  followups=", ".join(data["Follow-Ups"]))
+            unchanged = {x for x, fields in updates.items() if all(current.get(x, {}).get(k) == v for k, v in fields.items())}
+            report = await airtable_json_update.batch_update_records(
+                "Applicants", {x: fields for x, fields in updates.items() if x not in unchanged}, session, workers=1)
+            for x, rec in items:
+                ok = x in unchanged or report[x]
+                record(x, "update", rec["compressed"], ok)
+                if not ok:
+                    counts["update_failed"] += 1
+                    print(f"record {x} not updated successfully")
+                    continue
+                counts["unchanged" if x in unchanged else "updated"] += 1
+                if "llm_analysis" in rec:
+                    await to_leads.put((x, rec))
+        
+        async def leads_handler(items:list):
+            records = dict(items)
+            report = await sync_leads(records, session, index=await leads_index)
+            counts["leads"] += sum(1 for res in report.values() if res)
+            for x, res in report.items():
+                record(x, "leads", records[x]["compressed"], res)
+        
+        stages = [
+            asyncio.create_task(extract_stage()),
+            asyncio.create_task(run_stage("filter", to_filter, filter_handler, [to_analyze, to_update, to_leads], filter_workers)),
+            asyncio.create_task(run_stage("analyze", to_analyze, analyze_handler, [to_update], analyze_workers, MAX_BATCH if batch_tokens else 1)),
+            asyncio.create_task(run_stage("update", to_update, update_handler, [to_leads], update_workers, airtable_json_update.BATCH_SIZE)),
+            asyncio.create_task(run_stage("leads", to_leads, leads_handler, [], 1, airtable_json_update.BATCH_SIZE)),
+        ]
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            for task in stages + [leads_index]:
+                task.cancel()
+        
+    return counts
+
+
+JOURNAL_FILE:Final = ".journal_extract_filter_evaluate.jsonl"
+
+async def main(resume:bool=False, mirror:bool=False, full_sync:bool=False):
     """_summary_
-    This function does the following actions
+    This function does the following actions, as concurrent stages ( see run_pipeline )
     1. extract - extract compressed JSON from Applicants table
     2. filter - apply the selection criteria to the data and filters out the data
     3. analyse - analyse the data against gemini LLM 
     4. update - update the leads table with the results
+    with resume, the work done by an interrupted run is skipped ( see JOURNAL_FILE )
+    with mirror, only the Applicants and Leads changed since the last run are fetched ( see mirror_store.py ),
+    full_sync reads them again and drops the deleted records ( a deleted lead is created again )
     """
-    extracted_data = extract()
-    print(f"data extracted")
-    
-    filtered, rejected= filter(extracted_data)
-    # print(f"filtered {filtered}")
-    print(f"applicants filtered based on criteria")
-    
-    analyzed = await analyze(filtered)
-    print(f"llm analysis completed ")
-    
-    await update(analyzed, rejected)
-    print(f"tables updated ")
+    cache = LLMCache()
+    store = None
+    try:
+        if mirror:
+            store = MirrorStore()
+            async with airtable_json_update.create_session() as session:
+                await airtable_json_update.sync_mirror(store, session, [APPLICANTS, LEADS], full=full_sync)
+        with Journal(JOURNAL_FILE, resume) as journal:
+            counts = await run_pipeline(cache=cache, journal=journal, store=store)
+    finally:
+        print(f"llm cache {cache.stats()}")
+        cache.close()
+        if store is not None:
+            store.close()
+    print(f"tables updated {counts}")
+    metrics.dump_if_configured()
     
     
 
+## pass --resume to continue an interrupted run
+## pass --mirror to read the Applicants and Leads from the local mirror, synced with the records changed since the last run
+## pass --full-sync with --mirror to read the whole tables into the mirror, the deleted records are dropped
+## set METRICS_FILE to dump the metrics of the run ( .prom or .json )
 if __name__ == "__main__":
     init()
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(resume="--resume" in sys.argv, mirror="--mirror" in sys.argv, full_sync="--full-sync" in sys.argv))
\ No newline at end of file
@@ -0,0 +1,85 @@
+import json
+import os
+import time
+from typing import Final
+
+FLUSH_EVERY:Final = 100
+OK:Final = "ok"
+FAILED:Final = "failed"
+
+
+class Journal:
+    """ append-only log of the completed work, one json line per ( applicant, stage, payload hash, outcome ).
+        the lines are written in batches and fsync'ed, a torn last line after a crash is dropped on load.
+
+        with resume, the existing journal is loaded and done() tells which work can be skipped,
+        otherwise the journal starts empty
+    """
+
+    def __init__(self, path:str, resume:bool=False, flush_every:int=FLUSH_EVERY) -> None:
+        self.path = path
+        self.flush_every = flush_every
+        self.completed:dict = {}
+        self.buffer:list[str] = []
+        self.skipped = 0
+
+        if resume:
+            self.load()
+        self.file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def load(self):
+        """ reads the completed work. a torn last line ( no newline, the crash hit the write ) is
+            truncated away, so the next entries don't get appended to it
+        """
+        if not os.path.exists(self.path):
+            return
+        complete = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                complete += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                key = (entry["applicant"], entry["stage"])
+                if entry["outcome"] == OK:
+                    self.completed[key] = entry["hash"]
+                else:
+                    self.completed.pop(key, None)
+        if complete < os.path.getsize(self.path):
+            os.truncate(self.path, complete)
+
+    def done(self, applicant:str, stage:str, payload_hash:str) -> bool:
+        """ True when the stage already succeeded for the applicant with the same input """
+        if self.completed.get((applicant, stage)) == payload_hash:
+            self.skipped += 1
+            return True
+        return False
+
+    def record(self, applicant:str, stage:str, payload_hash:str, outcome:str=OK):
+        entry = {"applicant": applicant, "stage": stage, "hash": payload_hash, "outcome": outcome, "time": time.time()}
+        self.buffer.append(json.dumps(entry, separators=(',', ':')))
+        if outcome == OK:
+            self.completed[(applicant, stage)] = payload_hash
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        self.file.write("\n".join(self.buffer) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self) -> 'Journal':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Final
+
+from compressed_json import content_sha
+
+CACHE_FILE:Final = ".llm_cache.sqlite"
+# profiles don't change often, a week old analysis is still good
+DEFAULT_TTL:Final = 7 * 24 * 3600
+MAX_ENTRIES:Final = 100_000
+
+
+def sha256(text:str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def cache_key(payload:dict, prompt_template:str, model:str) -> str:
+    """ the same applicant, prompt and model give the same key, the plain and the compact Compressed_JSON too """
+    return sha256(f"{content_sha(payload)}:{sha256(prompt_template)}:{model}")
+
+
+class LLMCache:
+    """ on-disk cache of the parsed llm outputs, with TTL and size based ( least recently used ) eviction """
+
+    def __init__(self, path:str=CACHE_FILE, ttl:float=DEFAULT_TTL, max_entries:int=MAX_ENTRIES) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self.conn.commit()
+
+    def get(self, *keys:str) -> dict|None:
+        """ the value of the first of the keys that is cached and not expired """
+        now = time.time()
+        for key in keys:
+            row = self.conn.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] <= self.ttl:
+                break
+        else:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key:str, value:dict):
+        now = time.time()
+        self.conn.execute("INSERT OR REPLACE INTO llm_cache (key, value, created, last_used) VALUES (?, ?, ?, ?)",
+                          (key, json.dumps(value), now, now))
+        self.conn.commit()
+
+    def evict(self):
+        """ drops the expired entries, then the least recently used ones above max_entries """
+        cur = self.conn.execute("DELETE FROM llm_cache WHERE created < ?", (time.time() - self.ttl,))
+        self.evictions += cur.rowcount
+        cur = self.conn.execute("""
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )""", (self.max_entries,))
+        self.evictions += cur.rowcount
+        self.conn.commit()
+
+    def stats(self) -> dict:
+        size = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": size}
+
+    def close(self):
+        self.evict()
+        self.conn.close()
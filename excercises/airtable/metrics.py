@@ -0,0 +1,149 @@
+import bisect
+import functools
+import inspect
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Final
+
+# lightweight counters and latency histograms, tagged by labels ( endpoint, stage, .. ).
+# dumped at the end of a run as a prometheus text file, or as json when the file ends with .json
+#   METRICS_FILE=metrics.prom python excercises/airtable/extract_filter_evaluate.py
+
+METRICS_FILE:Final = "METRICS_FILE"
+# seconds, from a fast local call to a slow llm answer
+BUCKETS:Final = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value:float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _escape(value:str) -> str:
+    """ label values in the prometheus text format, an endpoint or an error message can hold quotes """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _key(name:str, labels:dict) -> tuple:
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+class Registry:
+
+    def __init__(self) -> None:
+        self.counters:dict = {}
+        self.histograms:dict = {}
+
+    def inc(self, name:str, value:float=1, **labels):
+        key = _key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name:str, value:float, **labels):
+        key = _key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name:str, **labels):
+        """ observes the duration of the block in `name`_seconds and counts the errors in `name`_errors_total """
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - started, **labels)
+
+    def timed(self, name:str, **labels):
+        """ decorator version of timer(), for plain and async functions """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(name, **labels):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
+
+    def to_json(self) -> dict:
+        return {
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(self.counters.items())],
+            "histograms": [{"name": name, "labels": dict(labels), "count": h.count, "sum": h.sum,
+                            "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts))}
+                           for (name, labels), h in sorted(self.histograms.items())],
+        }
+
+    def to_prometheus(self) -> str:
+        def fmt(labels:tuple, extra:tuple=()) -> str:
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(self.counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{fmt(labels)} {value}")
+
+        for (name, labels), h in sorted(self.histograms.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, bucket in zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts):
+                cumulative += bucket
+                lines.append(f"{name}_bucket{fmt(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{fmt(labels)} {h.sum}")
+            lines.append(f"{name}_count{fmt(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path:str):
+        with open(path, "w") as f:
+            if path.endswith(".json"):
+                json.dump(self.to_json(), f, indent=2)
+            else:
+                f.write(self.to_prometheus())
+
+
+REGISTRY = Registry()
+
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+
+
+def dump_if_configured():
+    """ writes the metrics to $METRICS_FILE, when it is set """
+    path = os.getenv(METRICS_FILE)
+    if path:
+        REGISTRY.dump(path)
+        print(f"metrics written to {path}")
@@ -0,0 +1,142 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Final, Iterator
+
+from applicant_join import EXPERIENCE, PERSONAL, SALARY
+from compressed_json import decode_compressed_json
+
+# local copy of the airtable tables. a sync ( airtable_json_update.sync_mirror ) only pulls the records
+# modified since the previous one, so the start up cost follows the number of changes and not the size of the base.
+# the deleted records are only seen by a full sync, one runs every FULL_SYNC_EVERY ( or on demand with full ).
+#   store = MirrorStore()
+#   await airtable_json_update.sync_mirror(store, session)
+#   store.fields(PERSONAL), store.by_application_id("Leads", 12) ..
+
+MIRROR_FILE:Final = ".airtable_mirror.sqlite"
+APPLICANTS:Final = "Applicants"
+LEADS:Final = "Leads"
+TABLES:Final = [APPLICANTS, PERSONAL, EXPERIENCE, SALARY, LEADS]
+# the next sync starts a bit before the previous one, for the clock drift and the writes made during the sync
+OVERLAP:Final = timedelta(seconds=60)
+# a deleted record stays in the mirror until the next full sync
+FULL_SYNC_EVERY:Final = timedelta(days=1)
+
+
+def airtable_time(when:datetime) -> str:
+    """ the ISO 8601 UTC spelling used in the formulas, "2025-01-01T00:00:00.000Z" """
+    return when.astimezone(timezone.utc).replace(tzinfo=None).isoformat(timespec="milliseconds") + "Z"
+
+
+def application_id_of(fields:dict) -> str|None:
+    """ the Application_ID field, or the one inside the Compressed_JSON of a lead """
+    value = fields.get("Application_ID")
+    if value is None and fields.get("Compressed_JSON"):
+        try:
+            value = decode_compressed_json(fields["Compressed_JSON"]).get("Application_ID")
+        except ValueError:
+            value = None
+    return None if value is None else str(value)
+
+
+def applicant_of(fields:dict) -> str|None:
+    """ the first linked Applicants record """
+    linked = fields.get("Applicants")
+    if isinstance(linked, list) and linked:
+        return linked[0]
+    return None
+
+
+class MirrorStore:
+    """ the records of the mirrored tables in sqlite, indexed by record id, Application_ID and linked applicant """
+
+    def __init__(self, path:str=MIRROR_FILE) -> None:
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                table_name TEXT NOT NULL,
+                id TEXT NOT NULL,
+                application_id TEXT,
+                applicant TEXT,
+                fields TEXT NOT NULL,
+                PRIMARY KEY (table_name, id)
+            );
+            CREATE INDEX IF NOT EXISTS records_application_id ON records (table_name, application_id);
+            CREATE INDEX IF NOT EXISTS records_applicant ON records (table_name, applicant);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                table_name TEXT PRIMARY KEY,
+                last_sync TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS full_sync_state (
+                table_name TEXT PRIMARY KEY,
+                last_full_sync REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def __enter__(self) -> 'MirrorStore':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def upsert(self, table_name:str, records:list[dict]):
+        """ raw airtable records ( id + fields ) """
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO records (table_name, id, application_id, applicant, fields) VALUES (?, ?, ?, ?, ?)",
+            [(table_name, r["id"], application_id_of(r["fields"]), applicant_of(r["fields"]), json.dumps(r["fields"]))
+             for r in records])
+        self.conn.commit()
+
+    def retain(self, table_name:str, ids:set):
+        """ drops the records that are no longer in the table, after a full sync """
+        stored = [row[0] for row in self.conn.execute("SELECT id FROM records WHERE table_name = ?", (table_name,))]
+        self.conn.executemany("DELETE FROM records WHERE table_name = ? AND id = ?",
+                              [(table_name, x) for x in stored if x not in ids])
+        self.conn.commit()
+
+    def last_sync(self, table_name:str) -> str|None:
+        row = self.conn.execute("SELECT last_sync FROM sync_state WHERE table_name = ?", (table_name,)).fetchone()
+        return row[0] if row else None
+
+    def set_last_sync(self, table_name:str, when:str):
+        self.conn.execute("INSERT OR REPLACE INTO sync_state (table_name, last_sync) VALUES (?, ?)", (table_name, when))
+        self.conn.commit()
+
+    def full_sync_due(self, table_name:str, now:datetime) -> bool:
+        """ True when the table was never fully synced, or not for FULL_SYNC_EVERY """
+        row = self.conn.execute("SELECT last_full_sync FROM full_sync_state WHERE table_name = ?", (table_name,)).fetchone()
+        return row is None or now.timestamp() - row[0] > FULL_SYNC_EVERY.total_seconds()
+
+    def set_last_full_sync(self, table_name:str, when:datetime):
+        self.conn.execute("INSERT OR REPLACE INTO full_sync_state (table_name, last_full_sync) VALUES (?, ?)",
+                          (table_name, when.timestamp()))
+        self.conn.commit()
+
+    def records(self, table_name:str) -> Iterator[dict]:
+        """ the records in the shape of the api, { "id": .., "fields": {..} } """
+        for record_id, fields in self.conn.execute("SELECT id, fields FROM records WHERE table_name = ?", (table_name,)):
+            yield {"id": record_id, "fields": json.loads(fields)}
+
+    def fields(self, table_name:str) -> list[dict]:
+        """ same as fetch_data_from_airtable """
+        return [json.loads(row[0]) for row in self.conn.execute("SELECT fields FROM records WHERE table_name = ?", (table_name,))]
+
+    def get(self, table_name:str, record_id:str) -> dict|None:
+        row = self.conn.execute("SELECT fields FROM records WHERE table_name = ? AND id = ?", (table_name, record_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def by_application_id(self, table_name:str, application_id) -> list[dict]:
+        return [{"id": record_id, "fields": json.loads(fields)} for record_id, fields in self.conn.execute(
+            "SELECT id, fields FROM records WHERE table_name = ? AND application_id = ?", (table_name, str(application_id)))]
+
+    def by_applicant(self, table_name:str, applicant:str) -> list[dict]:
+        return [{"id": record_id, "fields": json.loads(fields)} for record_id, fields in self.conn.execute(
+            "SELECT id, fields FROM records WHERE table_name = ? AND applicant = ?", (table_name, applicant))]
+
+    def count(self, table_name:str) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM records WHERE table_name = ?", (table_name,)).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
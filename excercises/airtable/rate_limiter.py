@@ -0,0 +1,150 @@
+import asyncio
+import random
+import time
+from typing import Final
+
+# Airtable allows 5 requests per second per base.
+# we stay a little below it, so that other clients of the base still get through
+RATE_PER_SECOND:Final = 4.5
+BURST:Final = 5
+MAX_CONCURRENCY:Final = 10
+MIN_CONCURRENCY:Final = 1
+# after a 429 airtable blocks the base for 30 seconds, when Retry-After is missing
+DEFAULT_RETRY_AFTER:Final = 30.0
+BACKOFF_BASE:Final = 0.5
+BACKOFF_CAP:Final = 30.0
+
+
+def parse_retry_after(value:str|None) -> float|None:
+    """ Retry-After is either a number of seconds or a http date, only the seconds form is supported """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class AdaptiveLimiter:
+    """ Limits the requests sent to one airtable base.
+
+        - token bucket, caps the request rate at `rate` per second
+        - AIMD, the number of requests in flight grows by one every `limit` successful responses
+          and is halved on every 429 / 5xx, so the throughput sits just below the server limit
+        - Retry-After, a 429 pauses every request of the base until the given time
+
+        usage:
+            async with limiter:
+                async with session.get(..) as response:
+                    limiter.record(response.status, response.headers.get("Retry-After"))
+    """
+
+    def __init__(self, rate:float=RATE_PER_SECOND, burst:int=BURST,
+                 max_concurrency:int=MAX_CONCURRENCY, min_concurrency:int=MIN_CONCURRENCY) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+        self.limit = float(max(min_concurrency, min(BURST, max_concurrency)))
+        self.in_flight = 0
+        self._slot_freed:asyncio.Condition|None = None
+
+        self.throttled = 0
+        self.requests = 0
+
+    def _reserve(self) -> float:
+        """ takes one token from the bucket and returns how long the caller has to wait for it.
+            the bucket may go negative, later callers then wait in line behind the earlier ones.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        self.requests += 1
+
+        delay = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(delay, self.paused_until - now)
+
+    async def acquire(self):
+        if self._slot_freed is None:
+            self._slot_freed = asyncio.Condition()
+
+        async with self._slot_freed:
+            await self._slot_freed.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+        delay = self._reserve()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except BaseException:
+                # cancelled while waiting for a token, __aexit__ won't run so the slot is given back here
+                await self.release()
+                raise
+
+    async def release(self):
+        # the slot is given back first, the notify may be cut short by a cancellation
+        self.in_flight -= 1
+        if self._slot_freed is not None:
+            async with self._slot_freed:
+                self._slot_freed.notify_all()
+
+    async def __aenter__(self) -> 'AdaptiveLimiter':
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.release()
+
+    def wait_sync(self):
+        """ blocking version of acquire() for the `requests` based calls of the synchronous scripts.
+            it sleeps and does not count the requests in flight, so it must not run in an event loop
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("wait_sync would block the event loop, use async with limiter")
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, status:int|None, retry_after:str|None=None):
+        """ feeds the response back into the limiter, status None means the request failed """
+        if status is not None and status < 400:
+            # additive increase, +1 per window of `limit` responses
+            self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            return
+
+        if status == 429 or status is None or status >= 500:
+            # multiplicative decrease
+            self.limit = max(self.min_concurrency, self.limit / 2)
+
+        if status == 429:
+            self.throttled += 1
+            wait = parse_retry_after(retry_after)
+            if wait is None:
+                wait = DEFAULT_RETRY_AFTER
+            self.paused_until = max(self.paused_until, time.monotonic() + wait)
+
+    def backoff(self, attempt:int) -> float:
+        """ full jitter backoff, or the remaining pause when the base is throttled """
+        pause = self.paused_until - time.monotonic()
+        if pause > 0:
+            return pause
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+_limiters:dict = {}
+
+def get_limiter(base_id:str) -> AdaptiveLimiter:
+    """ one limiter per airtable base, shared by every client of the process """
+    if base_id not in _limiters:
+        _limiters[base_id] = AdaptiveLimiter()
+    return _limiters[base_id]
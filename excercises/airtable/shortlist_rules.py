@@ -0,0 +1,157 @@
+import json
+import os
+from datetime import datetime
+from typing import Callable, Final, Tuple
+
+# shortlist rules, one ruleset per hiring profile
+RULES_FILE:Final = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shortlist_rules.json")
+DEFAULT_PROFILE:Final = "default"
+# how often the rules are re-ordered by the number of rejections
+REORDER_EVERY:Final = 1024
+
+
+def calculate_experience_years(experience_list):
+    total_days = 0
+    for job in experience_list:
+        try:
+            start = datetime.strptime(job["Start"], "%Y-%m-%d")
+            end = datetime.strptime(job["End"], "%Y-%m-%d")
+            total_days += (end - start).days
+        except (KeyError, TypeError, ValueError):
+            # missing or malformed dates, the job is not counted
+            continue
+    return total_days / 365.0  # Convert to years
+
+
+class Rule:
+    """ one compiled check, `check` decides and `describe` builds the reason text of an accepted applicant """
+
+    def __init__(self, name:str, check:Callable[[dict], bool], describe:Callable[[dict], str]) -> None:
+        self.name = name
+        self.check = check
+        self.describe = describe
+        self.rejections = 0
+        # the parameters of the config file, used by the batch scorer
+        self.params:dict = {}
+
+
+def experience_reason(min_years:float, has_years:bool, has_tier1:bool) -> str:
+    if has_years and has_tier1:
+        return f"more than {min_years} years of experience and worked in tier1 company."
+    if has_years:
+        return f"more than {min_years} years of experience."
+    return "has tier 1 company experience."
+
+
+def experience_rule(min_years:float=4, tier1_companies:list|None=None) -> Rule:
+    tier1 = frozenset(tier1_companies or [])
+
+    def years_ok(record:dict) -> bool:
+        return calculate_experience_years(record.get("experience", [])) >= min_years
+
+    def tier1_ok(record:dict) -> bool:
+        return any(job.get("Company") in tier1 for job in record.get("experience", []))
+
+    def check(record:dict) -> bool:
+        # the company lookup is cheaper than parsing the dates
+        return tier1_ok(record) or years_ok(record)
+
+    def describe(record:dict) -> str:
+        return experience_reason(min_years, years_ok(record), tier1_ok(record))
+
+    return Rule("experience", check, describe)
+
+
+def max_rate_rule(value:float) -> Rule:
+    def check(record:dict) -> bool:
+        return record.get("salary", {}).get("Preferred Rate", float('inf')) <= value
+    return Rule("max_rate", check, lambda record: f" Rate is less than {value}.")
+
+
+def min_availability_rule(value:float) -> Rule:
+    def check(record:dict) -> bool:
+        return record.get("salary", {}).get("Availability", 0) >= value
+    return Rule("min_availability", check, lambda record: f" Availability is greater than {value} hours/week")
+
+
+def location_rule(allowed:list) -> Rule:
+    locations = frozenset(allowed)
+    def check(record:dict) -> bool:
+        return record.get("personal", {}).get("Location", "") in locations
+    return Rule("location", check, lambda record: "")
+
+
+RULE_TYPES:Final = {
+    "experience": experience_rule,
+    "max_rate": max_rate_rule,
+    "min_availability": min_availability_rule,
+    "location": location_rule,
+}
+
+
+class Ruleset:
+    """ all the rules of one profile compiled into a single short-circuit predicate.
+        the rules that reject most often are moved to the front as the ruleset runs.
+    """
+
+    def __init__(self, name:str, rules:list[Rule]) -> None:
+        self.name = name
+        # the reason text keeps the order of the config file
+        self.rules = rules
+        self.order = list(rules)
+        self.evaluated = 0
+
+    def __call__(self, record:dict) -> bool:
+        self.evaluated += 1
+        if self.evaluated % REORDER_EVERY == 0:
+            self.order.sort(key=lambda rule: rule.rejections, reverse=True)
+
+        for rule in self.order:
+            if not rule.check(record):
+                rule.rejections += 1
+                return False
+        return True
+
+    def reason(self, record:dict) -> str:
+        return "Applicant has " + "".join(rule.describe(record) for rule in self.rules)
+
+    def evaluate(self, record:dict) -> Tuple[bool, str]:
+        """ the reason is only built for the accepted applicants """
+        if self(record):
+            return True, self.reason(record)
+        return False, ""
+
+    def stats(self) -> dict:
+        return {rule.name: rule.rejections for rule in self.rules}
+
+
+def compile_ruleset(name:str, config:list[dict]) -> Ruleset:
+    rules = []
+    for entry in config:
+        params = dict(entry)
+        rule_type = params.pop("rule")
+        if rule_type not in RULE_TYPES:
+            raise ValueError(f"unknown rule {rule_type} in profile {name}")
+        rule = RULE_TYPES[rule_type](**params)
+        rule.params = params
+        rules.append(rule)
+    return Ruleset(name, rules)
+
+
+def load_rulesets(path:str=RULES_FILE) -> dict:
+    """ returns { profile: Ruleset } from the json config file """
+    with open(path) as f:
+        config = json.load(f)
+    return {name: compile_ruleset(name, rules) for name, rules in config.items()}
+
+
+_rulesets:dict = {}
+
+def get_ruleset(profile:str=DEFAULT_PROFILE, path:str=RULES_FILE) -> Ruleset:
+    """ compiled rulesets are cached, so the rejection counters survive across calls """
+    if path not in _rulesets:
+        _rulesets[path] = load_rulesets(path)
+    rulesets = _rulesets[path]
+    if profile not in rulesets:
+        raise ValueError(f"unknown profile {profile}, available {list(rulesets.keys())}")
+    return rulesets[profile]
@@ -0,0 +1,68 @@
+import asyncio
+from typing import Awaitable, Callable, Final
+
+import metrics
+
+QUEUE_SIZE:Final = 100
+
+# end of stream marker
+DONE:Final = object()
+
+
+class Channel:
+    """ bounded queue between two pipeline stages. a full channel blocks the producers ( backpressure ).
+        the channel ends once every producer stage called close()
+    """
+
+    def __init__(self, maxsize:int=QUEUE_SIZE, producers:int=1) -> None:
+        self.queue:asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.producers = producers
+
+    async def put(self, item):
+        await self.queue.put(item)
+
+    async def close(self):
+        self.producers -= 1
+        if self.producers == 0:
+            await self.queue.put(DONE)
+
+    async def get(self):
+        """ returns the next item or DONE, DONE is put back for the other workers of the stage """
+        item = await self.queue.get()
+        if item is DONE:
+            self.queue.put_nowait(DONE)
+        return item
+
+    def get_ready(self, limit:int) -> list:
+        """ the items already waiting in the channel, without blocking. used to batch the work """
+        items = []
+        while len(items) < limit and not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is DONE:
+                self.queue.put_nowait(DONE)
+                break
+            items.append(item)
+        return items
+
+
+async def run_stage(name:str, inbox:Channel, handler:Callable[[list], Awaitable[None]],
+                    outboxes:list[Channel], workers:int=1, batch:int=1):
+    """ runs `workers` copies of the handler over the inbox, each call gets up to `batch` ready items.
+        the outboxes are closed when the inbox is drained
+    """
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is DONE:
+                return
+            items = [item] + inbox.get_ready(batch - 1)
+            metrics.inc("stage_items_total", len(items), stage=name)
+            with metrics.timer("stage", stage=name):
+                await handler(items)
+
+    try:
+        await asyncio.gather(*[worker() for _ in range(max(1, workers))])
+    finally:
+        for outbox in outboxes:
+            await outbox.close()
+    print(f"stage {name} completed")
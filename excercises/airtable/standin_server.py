@@ -0,0 +1,257 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Final
+
+from aiohttp import web
+
+from synthetic_data import applicant_id, generate_tables
+
+# local stand-in for the Airtable and Gemini endpoints used by the scripts, for tests and benchmarks.
+# point the scripts to it with
+#   AIRTABLE_API_URL=http://127.0.0.1:8080/v0
+#   GEMINI_BASE_URL=http://127.0.0.1:8080
+
+MAX_BATCH:Final = 10
+FORMULA:Final = re.compile(r"^\{(?P<field>[^}]+)\}\s*=\s*'?(?P<value>[^']*)'?$")
+MODIFIED_SINCE:Final = re.compile(r"^IS_AFTER\(\s*LAST_MODIFIED_TIME\(\)\s*,\s*'(?P<since>[^']+)'\s*\)$")
+
+
+class FaultConfig:
+    """ latency in seconds ( plus up to `jitter` ), the share of requests answered with a 429, the page size """
+
+    def __init__(self, latency:float=0.0, jitter:float=0.0, rate_429:float=0.0,
+                 retry_after:float=1.0, page_size:int=100, llm_latency:float=0.0, seed:int=42) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.page_size = page_size
+        self.llm_latency = llm_latency
+        self.rng = random.Random(seed)
+
+
+class StandinState:
+    """ the tables of one base, table -> { recordId: fields } """
+
+    def __init__(self) -> None:
+        self.tables:dict = {}
+        self.key_lists:dict = {}
+        # table -> { recordId: last modified time }
+        self.modified:dict = {}
+        self.ids = itertools.count()
+        self.requests:Counter = Counter()
+        self.throttled = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def table(self, name:str) -> dict:
+        return self.tables.setdefault(name, {})
+
+    def keys(self, name:str) -> list:
+        """ the record ids in insertion order, records are never deleted so the length tells if the list is stale """
+        table = self.table(name)
+        keys = self.key_lists.get(name)
+        if keys is None or len(keys) != len(table):
+            keys = list(table.keys())
+            self.key_lists[name] = keys
+        return keys
+
+    def touch(self, name:str, record_id:str):
+        self.modified.setdefault(name, {})[record_id] = datetime.now(timezone.utc)
+
+    def new_id(self) -> str:
+        return f"rec{next(self.ids):014d}"
+
+    def seed(self, n:int, seed:int=42, combined:dict|None=None):
+        """ n synthetic applicants. with the output of combine_data, the Applicants also get their Compressed_JSON """
+        for name, rows in generate_tables(n, seed).items():
+            table = self.table(name)
+            for row in rows:
+                record_id = self.new_id()
+                table[record_id] = row
+                self.touch(name, record_id)
+        applicants = self.table("Applicants")
+        for i in range(n):
+            fields:dict = {"Application_ID": i}
+            if combined is not None and applicant_id(i) in combined:
+                fields["Compressed_JSON"] = json.dumps(combined[applicant_id(i)], separators=(',', ':'))
+            applicants[applicant_id(i)] = fields
+            self.touch("Applicants", applicant_id(i))
+
+    def stats(self) -> dict:
+        return {"requests": dict(self.requests), "total_requests": sum(self.requests.values()),
+                "throttled": self.throttled, "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+
+def matches(state:StandinState, table_name:str, record_id:str, formula:str) -> bool:
+    """ only the {Field} = value and IS_AFTER(LAST_MODIFIED_TIME(), '..') formulas used by the scripts are supported """
+    fields = state.table(table_name)[record_id]
+    m = MODIFIED_SINCE.match(formula.strip())
+    if m is not None:
+        since = datetime.fromisoformat(m.group("since").replace("Z", "+00:00"))
+        return state.modified.get(table_name, {}).get(record_id, since) > since
+    m = FORMULA.match(formula.strip())
+    if m is None:
+        raise web.HTTPUnprocessableEntity(text=json.dumps({"error": {"type": "INVALID_FILTER_BY_FORMULA"}}))
+    value = fields.get(m.group("field"))
+    if isinstance(value, list):
+        # a linked field compares with the primary field ( Application_ID ) of the linked records
+        applicants = state.table("Applicants")
+        value = [applicants.get(x, {}).get("Application_ID", x) for x in value]
+        return any(str(v) == m.group("value") for v in value)
+    return str(value) == m.group("value")
+
+
+def create_app(state:StandinState, faults:FaultConfig) -> web.Application:
+
+    @web.middleware
+    async def inject_faults(request:web.Request, handler):
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        state.requests[f"{request.method} {route}"] += 1
+        state.bytes_in += request.content_length or 0
+
+        delay = faults.latency + faults.rng.random() * faults.jitter
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if faults.rate_429 > 0 and faults.rng.random() < faults.rate_429:
+            state.throttled += 1
+            return web.json_response({"errors": [{"error": "RATE_LIMIT_REACHED"}]}, status=429,
+                                     headers={"Retry-After": str(faults.retry_after)})
+
+        response = await handler(request)
+        state.bytes_out += response.content_length or 0
+        return response
+
+    def record_json(record_id:str, fields:dict) -> dict:
+        return {"id": record_id, "createdTime": "2025-01-01T00:00:00.000Z", "fields": fields}
+
+    async def list_records(request:web.Request):
+        table = state.table(request.match_info["table"])
+        query = request.query
+        page_size = min(int(query.get("pageSize", faults.page_size)), faults.page_size)
+        offset = int(query.get("offset", 0))
+
+        keys = state.keys(request.match_info["table"])
+        if "filterByFormula" in query:
+            keys = [k for k in keys if matches(state, request.match_info["table"], k, query["filterByFormula"])]
+        if "maxRecords" in query:
+            keys = keys[:int(query["maxRecords"])]
+
+        body:dict = {"records": [record_json(k, table[k]) for k in keys[offset:offset + page_size]]}
+        if offset + page_size < len(keys):
+            body["offset"] = str(offset + page_size)
+        return web.json_response(body)
+
+    def too_many(records:list):
+        if len(records) > MAX_BATCH:
+            raise web.HTTPUnprocessableEntity(text=json.dumps({"error": {"type": "INVALID_RECORDS"}}))
+
+    async def update_records(request:web.Request):
+        table = state.table(request.match_info["table"])
+        body = await request.json()
+        records = body.get("records", [])
+        too_many(records)
+
+        merge_on = body.get("performUpsert", {}).get("fieldsToMergeOn")
+        out = []
+        for record in records:
+            record_id = record.get("id")
+            if record_id is None and merge_on:
+                key = tuple(record["fields"].get(f) for f in merge_on)
+                record_id = next((k for k, v in table.items() if tuple(v.get(f) for f in merge_on) == key), None)
+                if record_id is None:
+                    record_id = state.new_id()
+                    table[record_id] = {}
+            if record_id not in table:
+                raise web.HTTPNotFound(text=json.dumps({"error": "NOT_FOUND"}))
+            table[record_id].update(record["fields"])
+            state.touch(request.match_info["table"], record_id)
+            out.append(record_json(record_id, table[record_id]))
+        return web.json_response({"records": out})
+
+    async def create_records(request:web.Request):
+        table = state.table(request.match_info["table"])
+        body = await request.json()
+        records = body.get("records", [body] if "fields" in body else [])
+        too_many(records)
+
+        out = []
+        for record in records:
+            record_id = state.new_id()
+            table[record_id] = dict(record["fields"])
+            state.touch(request.match_info["table"], record_id)
+            out.append(record_json(record_id, table[record_id]))
+        return web.json_response({"records": out} if "records" in body else out[0])
+
+    async def update_record(request:web.Request):
+        table = state.table(request.match_info["table"])
+        record_id = request.match_info["record"]
+        if record_id not in table:
+            raise web.HTTPNotFound(text=json.dumps({"error": "NOT_FOUND"}))
+        body = await request.json()
+        table[record_id].update(body["fields"])
+        state.touch(request.match_info["table"], record_id)
+        return web.json_response(record_json(record_id, table[record_id]))
+
+    async def generate_content(request:web.Request):
+        """ fake gemini, answers the single and the packed prompts with a valid analysis """
+        if faults.llm_latency > 0:
+            await asyncio.sleep(faults.llm_latency)
+        body = await request.json()
+        prompt = "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+
+        def analysis(score:int) -> dict:
+            return {"Summary": "Synthetic applicant.", "Score": score, "Issues": "None",
+                    "Follow-Ups": ["What is your notice period?"]}
+
+        if "Applicant profiles:" in prompt:
+            lines = prompt.split("Applicant profiles:", 1)[1].strip().splitlines()
+            ids = [json.loads(line).get("Application_ID") for line in lines if line.strip()]
+            text = json.dumps([dict(analysis(5), Application_ID=x) for x in ids])
+        else:
+            text = json.dumps(analysis(5))
+
+        return web.json_response({"candidates": [{"content": {"role": "model", "parts": [{"text": text}]},
+                                                  "finishReason": "STOP"}]})
+
+    app = web.Application(middlewares=[inject_faults])
+    app.router.add_get("/v0/{base}/{table}", list_records)
+    app.router.add_patch("/v0/{base}/{table}", update_records)
+    app.router.add_post("/v0/{base}/{table}", create_records)
+    app.router.add_patch("/v0/{base}/{table}/{record}", update_record)
+    app.router.add_post("/v1beta/models/{model}:generateContent", generate_content)
+    return app
+
+
+async def start(state:StandinState, faults:FaultConfig, host:str="127.0.0.1", port:int=8080) -> web.AppRunner:
+    runner = web.AppRunner(create_app(state, faults))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local Airtable / Gemini stand-in")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--applicants", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    state = StandinState()
+    state.seed(args.applicants)
+    faults = FaultConfig(args.latency, args.jitter, args.rate_429, page_size=args.page_size, llm_latency=args.llm_latency)
+    web.run_app(create_app(state, faults), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import random
+from typing import Final
+
+COMPANIES:Final = ["Google", "Meta", "OpenAI", "Acme", "Initech", "Globex", "Umbrella", "Hooli", "Stark", "Wayne"]
+TITLES:Final = ["Engineer", "Senior Engineer", "Staff Engineer", "Manager", "Analyst"]
+TECHNOLOGIES:Final = ["Python", "Go", "Rust", "Java", "SQL", "Kubernetes", "React"]
+LOCATIONS:Final = ["US", "Canada", "UK", "Germany", "India", "France", "Brazil", "Japan"]
+CURRENCIES:Final = ["USD", "EUR", "GBP", "INR"]
+
+
+def applicant_id(i:int) -> str:
+    """ airtable like record id of the i-th applicant """
+    return f"recA{i:013d}"
+
+
+def personal_row(rng:random.Random, i:int) -> dict:
+    return {
+        "Full Name": f"Applicant {i}",
+        "Email": f"applicant{i}@example.com",
+        "Location": rng.choice(LOCATIONS),
+        "LinkedIn": f"https://linkedin.com/in/applicant{i}",
+        "Applicants": [applicant_id(i)],
+    }
+
+
+def experience_rows(rng:random.Random, i:int, max_jobs:int=4) -> list[dict]:
+    rows = []
+    year = rng.randint(2005, 2018)
+    for _ in range(rng.randint(0, max_jobs)):
+        start_year = year + rng.randint(0, 2)
+        end_year = start_year + rng.randint(0, 4)
+        rows.append({
+            "Company": rng.choice(COMPANIES),
+            "Title": rng.choice(TITLES),
+            "Start": f"{start_year}-{rng.randint(1, 12):02d}-01",
+            "End": f"{end_year}-{rng.randint(1, 12):02d}-28",
+            "Technologies": ", ".join(rng.sample(TECHNOLOGIES, 2)),
+            "Applicants": [applicant_id(i)],
+        })
+        year = end_year
+    return rows
+
+
+def salary_row(rng:random.Random, i:int) -> dict:
+    rate = rng.randint(40, 160)
+    return {
+        "Preferred Rate": rate,
+        "Minimum_Rate": rate - rng.randint(0, 20),
+        "Currency": rng.choice(CURRENCIES),
+        "Availability": rng.choice([10, 20, 30, 40]),
+        "Applicants": [applicant_id(i)],
+    }
+
+
+def generate_tables(n:int, seed:int=42) -> dict:
+    """ the Personal_Details, Work_Experience and Salary_Prefs rows of n applicants, always the same for a seed """
+    rng = random.Random(seed)
+    personal, experience, salary = [], [], []
+    for i in range(n):
+        personal.append(personal_row(rng, i))
+        experience.extend(experience_rows(rng, i))
+        salary.append(salary_row(rng, i))
+    return {"Personal_Details": personal, "Work_Experience": experience, "Salary_Prefs": salary}
+
@@ -1,18 +1,125 @@
-from typing import Tuple
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Final, Iterable, Tuple
 
-def count(input: list[int]) -> Tuple[int, int]:
+# numpy is only needed by the vectorized, streaming and parallel modes
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# values read at a time by the streaming mode
+CHUNK_SIZE:Final = 1 << 20
+# below this size the process pool costs more than it saves
+PARALLEL_MIN:Final = 1 << 22
+
+
+def count_from(input: Iterable[int], highest: int = 0) -> Tuple[int, int]:
+    """ the number of new highest values after `highest`, and the highest value seen """
     count = 0
-    highest = 0
-    
+
     for x in input :
         if x > highest :
             highest = x
             count += 1
-            
-    return (count, 6)
+
+    return (count, highest)
+
+
+def count(input: list[int]) -> int:
+    return count_from(input)[0]
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required by this mode of count")
+
+
+def count_vectorized(input, highest: int = 0) -> int:
+    """ running maximum of the whole array, then the places where it grows """
+    _require_numpy()
+    return _count_chunk(np.asarray(input), highest)[0]
+
+
+def _count_chunk(values, highest):
+    """ ( count, highest ) of a numpy chunk that starts after `highest` """
+    if len(values) == 0:
+        return 0, highest
+    running = np.maximum.accumulate(values)
+    np.maximum(running, highest, out=running)
+    count = int(running[0] > highest) + int(np.count_nonzero(running[1:] != running[:-1]))
+    return count, running[-1].item()
+
+
+def count_stream(input: Iterable[int], chunk_size: int = CHUNK_SIZE, dtype=None) -> int:
+    """ any iterable ( generator, numpy array, memory mapped file ) in chunks of chunk_size values,
+        the highest value is carried from one chunk to the next
+    """
+    if np is None:
+        return count_from(input)[0]
+
+    total, highest = 0, 0
+    if isinstance(input, np.ndarray):
+        # slices of an array ( or a memmap ) are views, nothing is copied
+        for start in range(0, len(input), chunk_size):
+            n, highest = _count_chunk(input[start:start + chunk_size], highest)
+            total += n
+        return total
+
+    values = iter(input)
+    while True:
+        chunk = np.fromiter(itertools.islice(values, chunk_size), dtype=dtype or np.int64)
+        if len(chunk) == 0:
+            return total
+        n, highest = _count_chunk(chunk, highest)
+        total += n
+
+
+def count_file(path: str, dtype="int64", chunk_size: int = CHUNK_SIZE) -> int:
+    """ a binary file of `dtype` values, memory mapped so only the current chunk is paged in """
+    _require_numpy()
+    if os.path.getsize(path) == 0:
+        return 0
+    return count_stream(np.memmap(path, dtype=dtype, mode="r"), chunk_size)
+
+
+def _chunk_records(values):
+    """ the values where the running maximum of the chunk grows ( after 0 ), a strictly increasing array """
+    if len(values) == 0:
+        return values
+    running = np.maximum.accumulate(values)
+    np.maximum(running, 0, out=running)
+    grows = np.empty(len(running), dtype=bool)
+    grows[0] = running[0] > 0
+    np.not_equal(running[1:], running[:-1], out=grows[1:])
+    return running[grows]
+
+
+def count_parallel(input, workers: int|None = None, min_size: int = PARALLEL_MIN) -> int:
+    """ splits the array between a process pool. a chunk's new highest values only count when they
+        beat the highest of all the chunks before it, so each chunk returns its records and they are
+        merged in order with the highest value carried across the boundaries
+    """
+    _require_numpy()
+    values = np.asarray(input)
+    workers = workers or os.cpu_count() or 1
+    if len(values) < min_size or workers == 1:
+        return _count_chunk(values, 0)[0]
+
+    total, highest = 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for records in executor.map(_chunk_records, np.array_split(values, workers)):
+            if len(records) == 0:
+                continue
+            total += len(records) - int(np.searchsorted(records, highest, side="right"))
+            highest = max(highest, records[-1].item())
+    return total
+
 
 if __name__ == '__main__':
     x = [3,4,5,2,3,8,6,4,5]
-    r, _ = count(x)
-    
-    print(f"output: {r}")
\ No newline at end of file
+    r = count(x)
+
+    print(f"output: {r}")
+    print(f"vectorized: {count_vectorized(x)} streaming: {count_stream(x, chunk_size=4)} parallel: {count_parallel(x, workers=2, min_size=0)}")
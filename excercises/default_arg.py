@@ -1,5 +1,23 @@
+import array
+import csv
+import io
+import json
+from typing import Final, Iterable, Iterator
+
+# numpy is only needed by the vectorized payroll
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# the pay items used when an employee has none
+DEFAULT_ITEMS:Final = tuple(x * 2 for x in range(5))
+
+
 class Employee:
     company = "ACME Corp"
+    # no per-instance __dict__, a few million of them fit in memory
+    __slots__ = ("name", "age")
     # name:str 
     # age:int
     
@@ -12,17 +30,16 @@ class Employee:
         # print(f"\"{self.name}\" = {self.age}")
         return f'{{"name": "{self.name}", "age": {self.age}}}'
     
-    def calculatSalary(self, items:list[int]=[]) -> int :
-        """ func to test memory leak in default args
+    def calculatSalary(self, items:list[int]|None=None) -> int :
+        """ func to test memory leak in default args, a None default instead of a shared list
+            and the caller's list is not modified
         """
-        if len(items) == 0:
-            items = [x * 2 for x in range(5)]
+        if not items:
+            items = DEFAULT_ITEMS
         
         total = 0    
         for x in items:
             total += x
-            
-        items.append( total)
         
         return total 
     
@@ -40,6 +57,86 @@ class Employee:
         return cls(n=data['name'], a=data['age'])
     
 
+
+class EmployeeTable:
+    """ struct of arrays of employees, one compact column per field instead of one object per employee.
+        the variable length fields are flat columns with offsets: employee i has items[offsets[i]:offsets[i+1]],
+        and its utf-8 name in name_data[name_offsets[i]:name_offsets[i+1]]
+    """
+    def __init__(self) -> None:
+        self.name_data = bytearray()
+        self.name_offsets = array.array("q", [0])
+        self.ages = array.array("i")
+        self.items = array.array("q")
+        self.offsets = array.array("q", [0])
+        
+    def append(self, name:str, age:int=20, items:Iterable[int]=()):
+        self.name_data += name.encode('utf-8')
+        self.name_offsets.append(len(self.name_data))
+        self.ages.append(age)
+        self.items.extend(items)
+        self.offsets.append(len(self.items))
+        
+    def __len__(self) -> int:
+        return len(self.ages)
+    
+    def name(self, i:int) -> str:
+        return self.name_data[self.name_offsets[i]:self.name_offsets[i + 1]].decode('utf-8')
+    
+    def __getitem__(self, i:int) -> Employee:
+        return Employee(self.name(i), self.ages[i])
+    
+    def __iter__(self) -> Iterator[Employee]:
+        for i in range(len(self)):
+            yield self[i]
+    
+    @classmethod
+    def from_jsonl(cls, lines:Iterable[str]) -> 'EmployeeTable':
+        """ one {"name": .., "age": .., "items": [..]} object per line, age and items are optional """
+        table = cls()
+        for line in lines:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            table.append(data['name'], int(data.get('age', 20)), data.get('items', ()))
+        return table
+    
+    @classmethod
+    def from_csv(cls, lines:Iterable[str]) -> 'EmployeeTable':
+        """ a name and an age column, every other column is a pay item ( empty cells are skipped ) """
+        table = cls()
+        for row in csv.DictReader(lines):
+            name = row.pop('name')
+            age = row.pop('age', None)
+            table.append(name, int(age) if age else 20, [int(x) for x in row.values() if x])
+        return table
+
+
+def load_employees(path:str) -> EmployeeTable:
+    """ streams a .jsonl or a .csv file into a table """
+    with open(path, newline='') as f:
+        if path.endswith('.csv'):
+            return EmployeeTable.from_csv(f)
+        return EmployeeTable.from_jsonl(f)
+
+
+def payroll(table:EmployeeTable, default_items:Iterable[int]=DEFAULT_ITEMS):
+    """ calculatSalary of every employee at once: the items column is summed once ( cumulative sum )
+        and each employee's total is the difference at its offsets
+    """
+    if np is None:
+        raise ImportError("numpy is required by payroll")
+    
+    items = np.frombuffer(table.items, dtype=np.int64) if len(table.items) else np.zeros(0, dtype=np.int64)
+    offsets = np.frombuffer(table.offsets, dtype=np.int64)
+    sums = np.concatenate(([0], np.cumsum(items)))
+    totals = sums[offsets[1:]] - sums[offsets[:-1]]
+    
+    # like calculatSalary, no items means the default ones
+    totals[offsets[1:] == offsets[:-1]] = sum(default_items)
+    return totals
+
+
 if __name__ == '__main__' :
     p = Employee("John", 34)
     print(p)
@@ -48,7 +145,7 @@ if __name__ == '__main__' :
 
     # Using the alternate constructor
     employee_data = '{"name": "Jane", "age": 29}'
-    p2 = Employee.from_dict(eval(employee_data))
+    p2 = Employee.from_dict(json.loads(employee_data))
     
     print(f"Created from dict: {p2}")
     
@@ -59,3 +156,6 @@ if __name__ == '__main__' :
     ###
     print(f'salary p1 = {p.calculatSalary()}')
     print(f'salary p2 = {p2.calculatSalary()}')
+    
+    table = EmployeeTable.from_csv(io.StringIO("name,age,base,bonus\nJohn,34,100,20\nJane,29,120,\n"))
+    print(f'payroll = {payroll(table).tolist()}, {table[1]}')
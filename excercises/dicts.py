@@ -1,4 +1,5 @@
 import copy
+from persistent_dict import freeze, thaw
 
 di = {"a": "apple", "b": "biscuit", 4: [3,4,5,6]}
 
@@ -23,4 +24,10 @@ for x in di.keys() :
 
 animals = ["dog", "cat", "mouse"]
 for i, value in enumerate(animals):
-    print(i, value)
\ No newline at end of file
+    print(i, value)
+
+# a persistent dict: every update returns a new version, the old one is a free snapshot
+state = freeze({"a": "apple", "h": {"x": "value"}, 4: [3,4,5,6]})
+snapshot = state
+state = state.set_in(["h", "x"], "new value").set(8, (4,5,6,7))
+print(f"state = {thaw(state)} ,  snapshot = {thaw(snapshot)}")
@@ -1,7 +1,20 @@
+import json, codecs, re
+import asyncio
+import aiohttp
 import requests
 from requests.adapters import HTTPAdapter
 from requests.sessions import Session
 import logging
+from typing import AsyncIterator, Final, Iterator, NamedTuple
+
+# works as a script ( python excercises/get_data_parse.py ) and as the excercises.get_data_parse module,
+# the metrics module is shared with the airtable scripts
+try:
+    from .airtable import metrics
+    from .http_cache import ResponseCache
+except ImportError:
+    from airtable import metrics
+    from http_cache import ResponseCache
 
 logging.basicConfig(
     level=logging.INFO,  # or DEBUG, WARNING, etc.
@@ -9,12 +22,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# bytes read at a time by the streaming calls
+STREAM_CHUNK:Final = 64 * 1024
+
 class MySession:
-    def __init__(self) -> None:
+    def __init__(self, cache:ResponseCache|None=None) -> None:
         self.session = requests.Session()
         adapter = HTTPAdapter(pool_connections=2, pool_maxsize=5)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
+        # optional cache of the GET responses, see get_data
+        self.cache = cache
         
     def getSession(self) -> Session:
         return self.session
@@ -24,16 +42,39 @@ class MyError(Exception):
     def __init__(self, *args: object) -> None:
         super().__init__(*args)
 
+@metrics.timed("http_request", endpoint="get_data")
 def get_data(session:MySession, url:str ) -> dict|None:
     
     logger.info(f"input {url}")
+    res = None
+    cache = session.cache
+    entry, fresh = cache.lookup(url) if cache is not None else (None, False)
+    if fresh:
+        metrics.inc("http_cache_total", result="hit")
+        try:
+            return json.loads(entry.body)
+        except json.JSONDecodeError as e:
+            raise MyError(f"invalid json from {url}: {e}", e)
+    
     try: 
         headers = {"Content-Type": "application/json"}
+        if entry is not None:
+            headers.update(entry.validators())
         res = session.getSession().get(url=url, headers=headers)
         
-        res.raise_for_status()
-        
-        out = res.json()
+        if res.status_code == 304 and entry is not None:
+            out = json.loads(entry.body)
+            cache.revalidated(url, entry, res.headers.get("ETag"), res.headers.get("Last-Modified"))
+            metrics.inc("http_cache_total", result="revalidated")
+        else:
+            res.raise_for_status()
+            body = res.content
+            metrics.inc("http_bytes_received_total", len(body), endpoint="get_data")
+            # parsed before it is cached, a body that is not json is never served from the cache
+            out = json.loads(body)
+            if cache is not None and "no-store" not in res.headers.get("Cache-Control", ""):
+                cache.put(url, body, res.headers.get("ETag"), res.headers.get("Last-Modified"))
+                metrics.inc("http_cache_total", result="miss")
         
         logger.info(f"received data = {len(out)}")
 
@@ -43,11 +84,16 @@ def get_data(session:MySession, url:str ) -> dict|None:
     except requests.exceptions.RequestException as e:
         logger.error(f"request error {e.errno}")
         raise MyError("request error: {e}", e)
+    except json.JSONDecodeError as e:
+        logger.error(f"invalid json from {url}")
+        raise MyError(f"invalid json from {url}: {e}", e)
     finally:
-        res.close()
+        if res is not None:
+            res.close()
         
     return out
 
+@metrics.timed("http_request", endpoint="post_data")
 def post_data(session:MySession, url:str, data:str) -> str:
     logger.info(f"POST data {url}")
     
@@ -56,14 +102,312 @@ def post_data(session:MySession, url:str, data:str) -> str:
         headers = {"Content-Type": "application/json"}
         out = session.getSession().post(url=url, data=data, headers=headers)
         
+        metrics.inc("http_bytes_sent_total", len(data), endpoint="post_data")
         out.raise_for_status()
+        metrics.inc("http_bytes_received_total", len(out.content), endpoint="post_data")
         res = out.json()
         
     except requests.exceptions.HTTPError as e:
         logger.error(f"http error {e.errno}:")
         
     return res
+
+
+# a number, true, false or null ends at the next whitespace or separator
+_SCALAR_END:Final = re.compile(r'[\s,\]]')
+_WHITESPACE:Final = re.compile(r'[ \t\r\n]*')
+
+
+class ArrayDecoder:
+    """ incremental decoder of a top level json array. feed() the body chunk by chunk and it returns
+        the elements completed so far, so only the current element is kept in memory.
+        a body that is not an array comes out whole from close()
+    """
+    def __init__(self) -> None:
+        self.text = codecs.getincrementaldecoder("utf-8")()
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        # start -> first -> item <-> next -> end, or start -> value when the body is not an array
+        self.state = "start"
+        # the size the current element must reach before it is decoded again
+        self.retry = 0
+        
+    def _skip(self) -> None:
+        self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            
+    def _error(self, message:str):
+        raise json.JSONDecodeError(message, self.buffer, self.pos)
+            
+    def _elements(self) -> list:
+        out = []
+        while self.state in ("first", "item", "next"):
+            self._skip()
+            if self.pos >= len(self.buffer):
+                break
+            c = self.buffer[self.pos]
+            if self.state == "first":
+                if c == "]":
+                    self.pos += 1
+                    self.state = "end"
+                else:
+                    self.state = "item"
+            elif self.state == "item":
+                if c in ",]":
+                    self._error("Expecting value")
+                if c not in '"[{':
+                    # "12" or "-1." may continue in the next chunk, a scalar is complete once a separator follows it
+                    if _SCALAR_END.search(self.buffer, self.pos) is None:
+                        break
+                    item, end = self.decoder.raw_decode(self.buffer, self.pos)
+                else:
+                    size = len(self.buffer) - self.pos
+                    if size < self.retry:
+                        break
+                    try:
+                        item, end = self.decoder.raw_decode(self.buffer, self.pos)
+                    except json.JSONDecodeError:
+                        # not complete yet ( close() reports a malformed one ). past one chunk, the next try waits until the
+                        # element doubled, so a large element is decoded a logarithmic number of times
+                        self.retry = 2 * size if size > STREAM_CHUNK else 0
+                        break
+                    self.retry = 0
+                out.append(item)
+                self.pos = _WHITESPACE.match(self.buffer, end).end()
+                if self.pos < len(self.buffer) and self.buffer[self.pos] == ",":
+                    # the common case, straight to the next element
+                    self.pos += 1
+                else:
+                    self.state = "next"
+            else:
+                if c not in ",]":
+                    self._error("Expecting ',' delimiter")
+                self.pos += 1
+                self.state = "item" if c == "," else "end"
+            
+        # drop what was consumed so the buffer stays the size of one element
+        if self.pos > STREAM_CHUNK:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        return out
+        
+    def feed(self, chunk:bytes) -> list:
+        self.buffer += self.text.decode(chunk)
+        if self.state == "start":
+            self._skip()
+            if self.pos >= len(self.buffer):
+                return []
+            if self.buffer[self.pos] != "[":
+                self.state = "value"
+                return []
+            self.pos += 1
+            self.state = "first"
+        return self._elements()
+    
+    def close(self) -> list:
+        self.buffer += self.text.decode(b"", final=True)
+        if self.state == "value":
+            return [json.loads(self.buffer[self.pos:])]
+        self.retry = 0
+        out = self._elements()
+        if self.state == "item" and self.pos < len(self.buffer):
+            # raises the error of a malformed or truncated element, a number at the very end is truncated too
+            self.decoder.raw_decode(self.buffer, self.pos)
+            self._error("truncated data")
+        self._skip()
+        if self.state != "end" or self.pos != len(self.buffer):
+            self._error("truncated or trailing data")
+        return out
+
+
+def stream_data(session:MySession, url:str, chunk_size:int=STREAM_CHUNK) -> Iterator:
+    """ streaming get_data, yields the elements of the top level array while the body downloads.
+        errors raise MyError: a stream that already yielded items can not return None
+    """
+    logger.info(f"streaming {url}")
+    headers = {"Content-Type": "application/json"}
+    decoder = ArrayDecoder()
+    count = 0
+    try:
+        with metrics.timer("http_request", endpoint="stream_data"), \
+             session.getSession().get(url=url, headers=headers, stream=True) as res:
+            res.raise_for_status()
+            for chunk in res.iter_content(chunk_size=chunk_size):
+                metrics.inc("http_bytes_received_total", len(chunk), endpoint="stream_data")
+                for item in decoder.feed(chunk):
+                    count += 1
+                    yield item
+            for item in decoder.close():
+                count += 1
+                yield item
+            
+    except requests.exceptions.RequestException as e:
+        logger.error(f"request error {e!r}")
+        raise MyError(f"request error: {e}", e)
+    except json.JSONDecodeError as e:
+        raise MyError(f"invalid json from {url}: {e}", e)
+    
+    logger.info(f"streamed items = {count}")
+        
+
+class AsyncSession:
+    """ async counterpart of MySession, one keep-alive connection pool shared by all the requests.
+        limit caps the connections in total, limit_per_host per host
+    """
+    def __init__(self, limit:int=20, limit_per_host:int=5, timeout:float=30) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.session:aiohttp.ClientSession|None = None
+        
+    def getSession(self) -> aiohttp.ClientSession:
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.session
+    
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+            
+    async def __aenter__(self) -> 'AsyncSession':
+        return self
+    
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+
+class FetchResult(NamedTuple):
+    url: str
+    data: dict|list|None
+    error: Exception|None = None
+
+
+@metrics.timed("http_request", endpoint="get_data_async")
+async def get_data_async(session:AsyncSession, url:str) -> dict|None:
+    """ same contract as get_data, http and connection errors give None, other request errors raise MyError """
+    logger.info(f"input {url}")
+    try:
+        headers = {"Content-Type": "application/json"}
+        async with session.getSession().get(url, headers=headers) as res:
+            res.raise_for_status()
+            body = await res.read()
+            
+        metrics.inc("http_bytes_received_total", len(body), endpoint="get_data_async")
+        out = json.loads(body)
+        logger.info(f"received data = {len(out)}")
+        
+    except (aiohttp.ClientResponseError, aiohttp.ClientConnectionError) as e:
+        logger.error(f"http error {e}")
+        return None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"request error {e!r}")
+        raise MyError(f"request error: {e}", e)
+    
+    return out
+
+
+@metrics.timed("http_request", endpoint="post_data_async")
+async def post_data_async(session:AsyncSession, url:str, data:str) -> dict|None:
+    logger.info(f"POST data {url}")
+    headers = {"Content-Type": "application/json"}
+    async with session.getSession().post(url, data=data, headers=headers) as out:
+        metrics.inc("http_bytes_sent_total", len(data), endpoint="post_data_async")
+        out.raise_for_status()
+        body = await out.read()
         
+    metrics.inc("http_bytes_received_total", len(body), endpoint="post_data_async")
+    return json.loads(body)
+
+
+async def fetch_all(session:AsyncSession, urls:list[str], data:list[str]|None=None, 
+                    concurrency:int=10) -> AsyncIterator[FetchResult]:
+    """ GET every url ( or POST data[i] to urls[i] ) with at most `concurrency` requests in flight.
+        yields the results in completion order, the errors are attached to their url
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one(i:int, url:str) -> FetchResult:
+        async with semaphore:
+            try:
+                if data is None:
+                    return FetchResult(url, await get_data_async(session, url))
+                return FetchResult(url, await post_data_async(session, url, data[i]))
+            except Exception as e:
+                return FetchResult(url, None, e)
+    
+    tasks = [asyncio.create_task(one(i, url)) for i, url in enumerate(urls)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def stream_data_async(session:AsyncSession, url:str, chunk_size:int=STREAM_CHUNK) -> AsyncIterator:
+    """ async stream_data """
+    logger.info(f"streaming {url}")
+    headers = {"Content-Type": "application/json"}
+    decoder = ArrayDecoder()
+    try:
+        with metrics.timer("http_request", endpoint="stream_data_async"):
+            async with session.getSession().get(url, headers=headers) as res:
+                res.raise_for_status()
+                async for chunk in res.content.iter_chunked(chunk_size):
+                    metrics.inc("http_bytes_received_total", len(chunk), endpoint="stream_data_async")
+                    for item in decoder.feed(chunk):
+                        yield item
+                for item in decoder.close():
+                    yield item
+                
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"request error {e!r}")
+        raise MyError(f"request error: {e}", e)
+    except json.JSONDecodeError as e:
+        raise MyError(f"invalid json from {url}: {e}", e)
+
+
+def get_many(urls:list[str], concurrency:int=10, limit_per_host:int=5) -> list[FetchResult]:
+    """ blocking wrapper of fetch_all, the results are in completion order """
+    async def run():
+        async with AsyncSession(limit=concurrency, limit_per_host=limit_per_host) as session:
+            return [r async for r in fetch_all(session, urls, concurrency=concurrency)]
+    return asyncio.run(run())
+
+
+def post_many(url:str, payloads:list[str], concurrency:int=10, limit_per_host:int=5) -> list[FetchResult]:
+    """ blocking wrapper of fetch_all for POSTs of every payload to the same url """
+    async def run():
+        async with AsyncSession(limit=concurrency, limit_per_host=limit_per_host) as session:
+            return [r async for r in fetch_all(session, [url] * len(payloads), payloads, concurrency)]
+    return asyncio.run(run())
+
+
+def test_get_concurrent():
+    logger.info(f"calling data concurrently")
+    urls =["https://jsonplaceholder.typicode.com/posts/",
+           "https://jsonplaceholder.typicode.com/posts/76",
+           "https://jsonplaceholder.typicode.com/posts/-74",
+           "http://jsonplaceholder.typicode.com/posts/76",
+           "http://jsonplaceholer.typicode.com/posts/76",]
+    
+    for r in get_many(urls):
+        if r.error is not None:
+            logger.error(f"{r.url} failed with {r.error!r}")
+        elif r.data is not None:
+            logger.info(f"{r.url} size of data {len(r.data)}")
+        else:
+            logger.info(f"{r.url} data is null")
+
+
+def test_post_concurrent():
+    logger.info("testing post calls concurrently")
+    payloads = [f'{{ "id": {x}, "name": "john"}}' for x in range(10,20,1)]
+    for r in post_many("https://jsonplaceholder.typicode.com/posts/", payloads):
+        logger.info(f"output = {r.data if r.error is None else r.error}")
+
 
 def test_get(session:MySession):
     logger.info(f"calling data")
@@ -83,6 +427,22 @@ def test_get(session:MySession):
         except MyError as e:
             logger.error(f"Error received {e.__str__}")
 
+def test_stream(session:MySession):
+    logger.info("streaming the posts")
+    for post in stream_data(session, "https://jsonplaceholder.typicode.com/posts/"):
+        logger.info(f"post {post.get('id')}: {post.get('title')}")
+
+
+def test_cache():
+    logger.info("calling the same url through the response cache")
+    cache = ResponseCache(ttl=0)
+    session = MySession(cache=cache)
+    for _ in range(3):
+        get_data(session=session, url="https://jsonplaceholder.typicode.com/posts/76")
+    logger.info(f"cache stats {cache.stats()}")
+    cache.close()
+
+
 def test_post(session:MySession):
     logger.info("testing post calls")
     outputs = []
@@ -100,6 +460,12 @@ def main():
     
     test_post(sess)
     test_get(sess)
+    test_stream(sess)
+    test_cache()
+    
+    test_post_concurrent()
+    test_get_concurrent()
+    metrics.dump_if_configured()
 
 
 if __name__ == "__main__" :
@@ -0,0 +1,147 @@
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Final
+
+CACHE_FILE:Final = ".http_cache.sqlite"
+# a fresh entry is served without asking the server, an older one is revalidated
+DEFAULT_TTL:Final = 300
+MAX_ENTRIES:Final = 256
+MAX_BYTES:Final = 32 * 2**20
+MAX_DISK_ENTRIES:Final = 10_000
+
+
+class CacheEntry:
+    __slots__ = ("body", "etag", "last_modified", "stored")
+
+    def __init__(self, body:bytes, etag:str|None, last_modified:str|None, stored:float) -> None:
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored = stored
+
+    def validators(self) -> dict:
+        """ the headers of a conditional GET """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """ two level cache of the GET responses: an in-memory LRU bounded by entries and bytes,
+        in front of an optional on-disk store ( sqlite ). an entry older than the TTL is only
+        kept when it has an ETag or a Last-Modified to revalidate it with
+    """
+
+    def __init__(self, ttl:float=DEFAULT_TTL, max_entries:int=MAX_ENTRIES, max_bytes:int=MAX_BYTES,
+                 path:str|None=CACHE_FILE, max_disk_entries:int=MAX_DISK_ENTRIES) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+        self.entries:OrderedDict[str, CacheEntry] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+        self.conn = None
+        if path is not None:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    url TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored REAL NOT NULL
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS http_cache_stored ON http_cache (stored)")
+            self.conn.commit()
+
+    def _remember(self, url:str, entry:CacheEntry):
+        old = self.entries.pop(url, None)
+        if old is not None:
+            self.size -= len(old.body)
+        if len(entry.body) > self.max_bytes:
+            return
+        self.entries[url] = entry
+        self.size += len(entry.body)
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted.body)
+            self.evictions += 1
+
+    def _load(self, url:str) -> CacheEntry|None:
+        if self.conn is None:
+            return None
+        row = self.conn.execute("SELECT body, etag, last_modified, stored FROM http_cache WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        entry = CacheEntry(bytes(row[0]), row[1], row[2], row[3])
+        self._remember(url, entry)
+        return entry
+
+    def _save(self, url:str, entry:CacheEntry):
+        if self.conn is None:
+            return
+        self.conn.execute("INSERT OR REPLACE INTO http_cache (url, body, etag, last_modified, stored) VALUES (?, ?, ?, ?, ?)",
+                          (url, entry.body, entry.etag, entry.last_modified, entry.stored))
+        self.conn.commit()
+
+    def lookup(self, url:str) -> tuple[CacheEntry|None, bool]:
+        """ (entry, fresh). a fresh entry counts as a hit, a stale one is returned for its validators """
+        entry = self.entries.get(url)
+        if entry is not None:
+            self.entries.move_to_end(url)
+        else:
+            entry = self._load(url)
+        if entry is None:
+            return None, False
+
+        if time.time() - entry.stored <= self.ttl:
+            self.hits += 1
+            return entry, True
+        if entry.etag or entry.last_modified:
+            return entry, False
+        return None, False
+
+    def put(self, url:str, body:bytes, etag:str|None=None, last_modified:str|None=None):
+        """ stores a full response, it was a miss """
+        self.misses += 1
+        entry = CacheEntry(body, etag, last_modified, time.time())
+        self._remember(url, entry)
+        self._save(url, entry)
+
+    def revalidated(self, url:str, entry:CacheEntry, etag:str|None=None, last_modified:str|None=None):
+        """ the server answered 304, the entry is fresh again """
+        self.revalidations += 1
+        entry.stored = time.time()
+        entry.etag = etag or entry.etag
+        entry.last_modified = last_modified or entry.last_modified
+        self._remember(url, entry)
+        self._save(url, entry)
+
+    def evict(self):
+        """ trims the disk store to the max_disk_entries most recently stored """
+        if self.conn is None:
+            return
+        self.conn.execute("""
+            DELETE FROM http_cache WHERE url IN (
+                SELECT url FROM http_cache ORDER BY stored DESC LIMIT -1 OFFSET ?
+            )""", (self.max_disk_entries,))
+        self.conn.commit()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "revalidations": self.revalidations,
+                "evictions": self.evictions, "entries": len(self.entries), "bytes": self.size}
+
+    def close(self):
+        if self.conn is not None:
+            self.evict()
+            self.conn.close()
+            self.conn = None
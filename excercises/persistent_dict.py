@@ -0,0 +1,337 @@
+from collections.abc import Mapping
+from typing import Any, Final, Hashable, Iterable, Iterator
+
+# a hash array mapped trie ( HAMT ): every node has up to 32 children picked by 5 bits of the key hash,
+# and only the children that exist are stored ( the bitmap tells which ). an update copies the nodes on
+# the path to the key, O(log32 n) of them, and shares everything else with the previous version.
+# a version never changes, so a snapshot is the reference itself.
+
+BITS:Final = 5
+MASK:Final = (1 << BITS) - 1
+# the hashes are cut to 64 bits, two keys with the same 64 bits end in a collision node
+HASH_BITS:Final = 64
+HASH_MASK:Final = (1 << HASH_BITS) - 1
+
+
+def _hash(key:Hashable) -> int:
+    return hash(key) & HASH_MASK
+
+
+class _Leaf:
+    __slots__ = ("hash", "key", "value")
+
+    def __init__(self, h:int, key, value) -> None:
+        self.hash = h
+        self.key = key
+        self.value = value
+
+
+class _Collision:
+    """ the leaves whose keys have the same hash """
+    __slots__ = ("hash", "leaves")
+
+    def __init__(self, h:int, leaves:tuple) -> None:
+        self.hash = h
+        self.leaves = leaves
+
+    def find(self, h:int, key, shift:int):
+        for leaf in self.leaves:
+            if leaf.key is key or leaf.key == key:
+                return leaf
+        return None
+
+    def assoc(self, leaf:_Leaf, shift:int) -> tuple:
+        for i, old in enumerate(self.leaves):
+            if old.key is leaf.key or old.key == leaf.key:
+                return _Collision(self.hash, self.leaves[:i] + (leaf,) + self.leaves[i + 1:]), False
+        return _Collision(self.hash, self.leaves + (leaf,)), True
+
+    def dissoc(self, h:int, key, shift:int):
+        for i, old in enumerate(self.leaves):
+            if old.key is key or old.key == key:
+                leaves = self.leaves[:i] + self.leaves[i + 1:]
+                return leaves[0] if len(leaves) == 1 else _Collision(self.hash, leaves)
+        return self
+
+    def leaves_iter(self) -> Iterator[_Leaf]:
+        yield from self.leaves
+
+
+class _Node:
+    __slots__ = ("bitmap", "children")
+
+    def __init__(self, bitmap:int, children:tuple) -> None:
+        self.bitmap = bitmap
+        self.children = children
+
+    def find(self, h:int, key, shift:int):
+        node = self
+        while True:
+            bit = 1 << ((h >> shift) & MASK)
+            if not node.bitmap & bit:
+                return None
+            child = node.children[(node.bitmap & (bit - 1)).bit_count()]
+            if type(child) is _Leaf:
+                return child if child.key is key or (child.hash == h and child.key == key) else None
+            if type(child) is _Collision:
+                return child.find(h, key, shift) if child.hash == h else None
+            node = child
+            shift += BITS
+
+    def assoc(self, leaf:_Leaf, shift:int) -> tuple:
+        """ ( new node, True when the key was added ) """
+        bit = 1 << ((leaf.hash >> shift) & MASK)
+        idx = (self.bitmap & (bit - 1)).bit_count()
+        if not self.bitmap & bit:
+            return _Node(self.bitmap | bit, self.children[:idx] + (leaf,) + self.children[idx:]), True
+
+        child = self.children[idx]
+        if type(child) is _Leaf:
+            if child.key is leaf.key or (child.hash == leaf.hash and child.key == leaf.key):
+                if child.value is leaf.value:
+                    return self, False
+                new, added = leaf, False
+            else:
+                new, added = _merge(child, leaf, shift + BITS), True
+        elif type(child) is _Collision and child.hash != leaf.hash:
+            new, added = _merge_collision(child, leaf, shift + BITS), True
+        else:
+            new, added = child.assoc(leaf, shift + BITS)
+            if new is child:
+                return self, False
+        return _Node(self.bitmap, self.children[:idx] + (new,) + self.children[idx + 1:]), added
+
+    def dissoc(self, h:int, key, shift:int):
+        """ the node without the key: self when the key is missing, None when the node is empty """
+        bit = 1 << ((h >> shift) & MASK)
+        if not self.bitmap & bit:
+            return self
+        idx = (self.bitmap & (bit - 1)).bit_count()
+        child = self.children[idx]
+        if type(child) is _Leaf:
+            if not (child.key is key or (child.hash == h and child.key == key)):
+                return self
+            new = None
+        elif type(child) is _Collision and child.hash != h:
+            return self
+        else:
+            new = child.dissoc(h, key, shift + BITS)
+            if new is child:
+                return self
+            # a node left with a single leaf is replaced by the leaf
+            if type(new) is _Node and len(new.children) == 1 and type(new.children[0]) is not _Node:
+                new = new.children[0]
+
+        if new is not None:
+            return _Node(self.bitmap, self.children[:idx] + (new,) + self.children[idx + 1:])
+        if self.bitmap == bit:
+            return None
+        return _Node(self.bitmap ^ bit, self.children[:idx] + self.children[idx + 1:])
+
+    def leaves_iter(self) -> Iterator[_Leaf]:
+        for child in self.children:
+            if type(child) is _Leaf:
+                yield child
+            else:
+                yield from child.leaves_iter()
+
+
+def _merge(a:_Leaf, b:_Leaf, shift:int):
+    """ the smallest subtree holding two leaves with different keys """
+    if a.hash == b.hash:
+        return _Collision(a.hash, (a, b))
+    frag_a = (a.hash >> shift) & MASK
+    frag_b = (b.hash >> shift) & MASK
+    if frag_a == frag_b:
+        return _Node(1 << frag_a, (_merge(a, b, shift + BITS),))
+    children = (a, b) if frag_a < frag_b else (b, a)
+    return _Node((1 << frag_a) | (1 << frag_b), children)
+
+
+def _merge_collision(collision:_Collision, leaf:_Leaf, shift:int) -> _Node:
+    frag_c = (collision.hash >> shift) & MASK
+    frag_l = (leaf.hash >> shift) & MASK
+    if frag_c == frag_l:
+        return _Node(1 << frag_c, (_merge_collision(collision, leaf, shift + BITS),))
+    children = (collision, leaf) if frag_c < frag_l else (leaf, collision)
+    return _Node((1 << frag_c) | (1 << frag_l), children)
+
+
+def _build(leaves:list, shift:int):
+    """ bulk load: the trie of leaves with distinct keys, in one pass per level instead of one update per key """
+    if len(leaves) == 1:
+        return leaves[0]
+    if all(leaf.hash == leaves[0].hash for leaf in leaves):
+        node:Any = _Collision(leaves[0].hash, (leaves[0],))
+        for leaf in leaves[1:]:
+            node, _ = node.assoc(leaf, shift)
+        return node
+
+    groups:dict = {}
+    for leaf in leaves:
+        groups.setdefault((leaf.hash >> shift) & MASK, []).append(leaf)
+    bitmap = 0
+    children = []
+    for frag in sorted(groups):
+        bitmap |= 1 << frag
+        children.append(_build(groups[frag], shift + BITS))
+    return _Node(bitmap, tuple(children))
+
+
+_EMPTY_NODE:Final = _Node(0, ())
+_MISSING:Final = object()
+
+
+class PersistentDict(Mapping):
+    """ immutable dict with structural sharing. the updates ( set, delete, set_in .. ) return a new
+        PersistentDict and leave this one unchanged, so keeping a snapshot costs nothing
+    """
+    __slots__ = ("_root", "_len")
+
+    def __init__(self, data:Mapping|Iterable|None=None, **kwargs) -> None:
+        items = dict(data or (), **kwargs)
+        root = _build([_Leaf(_hash(k), k, v) for k, v in items.items()], 0) if items else _EMPTY_NODE
+        if type(root) is not _Node:
+            # a single leaf, or a collision when every key has the same hash
+            root = _Node(1 << (root.hash & MASK), (root,))
+        self._root = root
+        self._len = len(items)
+
+    @classmethod
+    def _make(cls, root:_Node, length:int) -> 'PersistentDict':
+        out = cls.__new__(cls)
+        out._root = root
+        out._len = length
+        return out
+
+    def __getitem__(self, key):
+        leaf = self._root.find(_hash(key), key, 0)
+        if leaf is None:
+            raise KeyError(key)
+        return leaf.value
+
+    def get(self, key, default=None):
+        leaf = self._root.find(_hash(key), key, 0)
+        return default if leaf is None else leaf.value
+
+    def __contains__(self, key) -> bool:
+        return self._root.find(_hash(key), key, 0) is not None
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator:
+        for leaf in self._root.leaves_iter():
+            yield leaf.key
+
+    def items(self):
+        return [(leaf.key, leaf.value) for leaf in self._root.leaves_iter()]
+
+    def values(self):
+        return [leaf.value for leaf in self._root.leaves_iter()]
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, Mapping) or len(self) != len(other):
+            return False
+        for leaf in self._root.leaves_iter():
+            value = other.get(leaf.key, _MISSING)
+            if value is _MISSING or not (value is leaf.value or value == leaf.value):
+                return False
+        return True
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f"PersistentDict({dict(self.items())!r})"
+
+    def __or__(self, other:Mapping) -> 'PersistentDict':
+        return self.update(other)
+
+    def snapshot(self) -> 'PersistentDict':
+        """ O(1), a version is never modified """
+        return self
+
+    def copy(self) -> 'PersistentDict':
+        return self
+
+    def set(self, key, value) -> 'PersistentDict':
+        root, added = self._root.assoc(_Leaf(_hash(key), key, value), 0)
+        if root is self._root:
+            return self
+        return self._make(root, self._len + added)
+
+    def delete(self, key) -> 'PersistentDict':
+        """ raises KeyError like del on a dict """
+        root = self._root.dissoc(_hash(key), key, 0)
+        if root is self._root:
+            raise KeyError(key)
+        return self._make(root if root is not None else _EMPTY_NODE, self._len - 1)
+
+    def discard(self, key) -> 'PersistentDict':
+        return self.delete(key) if key in self else self
+
+    def update(self, other:Mapping|Iterable=(), **kwargs) -> 'PersistentDict':
+        out = self
+        for key, value in dict(other, **kwargs).items():
+            out = out.set(key, value)
+        return out
+
+    def get_in(self, path:Iterable, default=None):
+        value:Any = self
+        for key in path:
+            if not isinstance(value, Mapping) or key not in value:
+                return default
+            value = value[key]
+        return value
+
+    def set_in(self, path:list|tuple, value) -> 'PersistentDict':
+        """ the nested value at path replaced, only the PersistentDicts on the path are copied.
+            the missing levels are created
+        """
+        if not path:
+            raise ValueError("empty path")
+        key = path[0]
+        if len(path) == 1:
+            return self.set(key, freeze(value))
+        child = self.get(key)
+        if not isinstance(child, PersistentDict):
+            child = freeze(child) if isinstance(child, Mapping) else EMPTY
+        return self.set(key, child.set_in(path[1:], value))
+
+    def update_in(self, path:list|tuple, func) -> 'PersistentDict':
+        return self.set_in(path, func(self.get_in(path)))
+
+    def delete_in(self, path:list|tuple) -> 'PersistentDict':
+        if len(path) == 1:
+            return self.delete(path[0])
+        child = self[path[0]]
+        return self.set(path[0], child.delete_in(path[1:]))
+
+
+EMPTY:Final = PersistentDict()
+
+
+def freeze(value):
+    """ nested dicts become PersistentDicts, lists tuples and sets frozensets, so no part of a snapshot can change """
+    if isinstance(value, PersistentDict):
+        return value
+    if isinstance(value, Mapping):
+        return PersistentDict({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """ the plain dicts and lists back, a deep copy """
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    if isinstance(value, frozenset):
+        return {thaw(v) for v in value}
+    return value
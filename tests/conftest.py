@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the airtable scripts import each other as top level modules ( import compressed_json, .. ),
+# so their directory is on the path for every test
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "excercises", "airtable"))
@@ -0,0 +1,56 @@
+import pytest
+
+from applicant_join import EXPERIENCE, PERSONAL, SALARY, ApplicantJoin, join_rows
+
+def personal(applicant, name):
+    return (PERSONAL, {"Full Name": name, "Email": f"{name}@x.com", "Applicants": [applicant]})
+
+def experience(applicant, company):
+    return (EXPERIENCE, {"Company": company, "Title": "Engineer", "Applicants": [applicant]})
+
+def salary(applicant, rate):
+    return (SALARY, {"Preferred Rate": rate, "Currency": "USD", "Applicants": [applicant]})
+
+def test_join_out_of_order():
+    rows = [
+        experience("rec2", "Google"),
+        salary("rec1", 90),
+        experience("rec1", "Meta"),
+        personal("rec2", "bob"),
+        salary("rec2", 100),
+        experience("rec1", "Stripe"),
+        personal("rec1", "ann"),
+    ]
+    data = join_rows(rows)
+    assert set(data) == {"rec1", "rec2"}
+    assert data["rec1"]["personal"]["Full Name"] == "ann"
+    assert [x["Company"] for x in data["rec1"]["experience"]] == ["Meta", "Stripe"]
+    assert data["rec1"]["salary"]["Preferred Rate"] == 90
+    assert list(data["rec2"]) == ["personal", "experience", "salary"]
+
+def test_join_waits_for_experience_table():
+    join = ApplicantJoin()
+    assert join.add(*personal("rec1", "ann")) == []
+    assert join.add(*salary("rec1", 90)) == []
+    assert join.add(*experience("rec1", "Meta")) == []
+    finished = join.table_done(EXPERIENCE)
+    assert [rec.applicant for rec in finished] == ["rec1"]
+    # complete applicants are emitted as soon as their rows arrive
+    assert [rec.applicant for rec in join.add(*personal("rec2", "bob"))] == []
+    assert [rec.applicant for rec in join.add(*salary("rec2", 100))] == ["rec2"]
+
+def test_join_orphans():
+    join = ApplicantJoin()
+    rows = [experience("rec9", "Meta"), salary("rec9", 90), personal("rec1", "ann"),
+            (PERSONAL, {"Full Name": "no link", "Email": "x@x.com"})]
+    for table_name, row in rows:
+        join.add(table_name, row)
+    finished = join.finish()
+    assert [rec.applicant for rec in finished] == ["rec1"]
+    assert finished[0].to_dict() == {"personal": {"Full Name": "ann", "Email": "ann@x.com"}}
+    assert join.orphans == 1
+    assert join.pending == {}
+
+def test_join_unknown_table():
+    with pytest.raises(ValueError):
+        ApplicantJoin().add("Leads", {"Applicants": ["rec1"]})
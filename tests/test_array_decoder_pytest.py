@@ -0,0 +1,77 @@
+import json
+import random
+
+import pytest
+
+from excercises import get_data_parse
+from excercises.get_data_parse import ArrayDecoder
+
+DATA = [
+    1, -23500.25, 0, 1e10, True, False, None, "",
+    "plain", "with \"quotes\" and \\ backslash", "brackets ] [ } { , in a string", "unicode é ✓ 😀",
+    [], {}, [1, [2, [3, []]]], {"a": {"b": [1, 2, {"c": "]"}]}, "d": None},
+]
+
+def decode(body:bytes, sizes) -> list:
+    decoder = ArrayDecoder()
+    out = []
+    start = 0
+    for size in sizes:
+        out.extend(decoder.feed(body[start:start + size]))
+        start += size
+    out.extend(decoder.feed(body[start:]))
+    out.extend(decoder.close())
+    return out
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_every_chunk_boundary(indent):
+    body = json.dumps(DATA, indent=indent, ensure_ascii=False).encode("utf-8")
+    for cut in range(len(body) + 1):
+        assert decode(body, [cut]) == DATA
+
+def test_one_byte_and_random_chunks():
+    body = json.dumps(DATA, ensure_ascii=False).encode("utf-8")
+    assert decode(body, [1] * len(body)) == DATA
+    rng = random.Random(3)
+    for _ in range(50):
+        assert decode(body, [rng.randint(1, 20) for _ in range(len(body))]) == DATA
+
+def test_elements_come_out_while_streaming():
+    decoder = ArrayDecoder()
+    assert decoder.feed(b'[{"a": 1}, 12') == [{"a": 1}]
+    # the number may continue in the next chunk
+    assert decoder.feed(b'3') == []
+    assert decoder.feed(b', "x') == [123]
+    assert decoder.feed(b'"') == ["x"]
+    assert decoder.feed(b']') == []
+    assert decoder.close() == []
+
+def test_empty_and_not_an_array():
+    assert decode(b"[]", []) == []
+    assert decode(b"  [ ]  ", [2]) == []
+    assert decode(b'{"a": [1, 2]}', [3]) == [{"a": [1, 2]}]
+
+def test_large_element_is_not_decoded_every_chunk(monkeypatch):
+    monkeypatch.setattr(get_data_parse, "STREAM_CHUNK", 1024)
+    calls = []
+    decoder = ArrayDecoder()
+    raw_decode = decoder.decoder.raw_decode
+    monkeypatch.setattr(decoder.decoder, "raw_decode", lambda *args: calls.append(1) or raw_decode(*args))
+    element = {"items": [{"id": i, "name": f"n{i}"} for i in range(2000)]}
+    body = json.dumps([element, element]).encode("utf-8")
+    out = []
+    for start in range(0, len(body), 100):
+        out.extend(decoder.feed(body[start:start + 100]))
+    out.extend(decoder.close())
+    assert out == [element, element]
+    # past one STREAM_CHUNK, one try each time the element doubled and not one per chunk
+    assert len(calls) < 2 * 20
+
+@pytest.mark.parametrize("body", [
+    b"[1,,2]", b"[1,]", b"[,1]", b"[,]", b"[1 2]", b'[{"a":1} {"b":2}]', b"[1}", b'[{"a":1]]',
+    b"[1, 2", b"[1, 2,", b'[{"a": 1', b'["abc', b"[1] 2", b"[12", b"", b"[tru]",
+])
+def test_malformed(body):
+    for cut in range(len(body) + 1):
+        with pytest.raises(json.JSONDecodeError):
+            decode(body, [cut])
@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+import extract_filter_evaluate
+import shortlist_rules
+from batch_scorer import ExperienceColumns, experience_years, filter_batch
+from compressed_json import encode_compressed_json
+
+COMPANIES = ["Google", "Meta", "OpenAI", "Acme", "Initech", "Globex"]
+LOCATIONS = ["US", "Canada", "UK", "Germany", "India", "France", "Brazil"]
+
+def applicant(rng, i):
+    experience = []
+    for _ in range(rng.randint(0, 4)):
+        start = f"{rng.randint(2005, 2022)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        end = f"{rng.randint(2005, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        experience.append({"Company": rng.choice(COMPANIES), "Start": start, "End": end})
+    data = {
+        "personal": {"Full Name": f"applicant {i}", "Location": rng.choice(LOCATIONS)},
+        "experience": experience,
+        "salary": {"Preferred Rate": rng.randint(40, 160), "Availability": rng.randint(5, 40)},
+    }
+    text, sha = encode_compressed_json(data, compact=i % 2 == 1)
+    return {"Application_ID": i, "Compressed_JSON": text, "SHA": sha}
+
+@pytest.fixture
+def fresh_rulesets(monkeypatch):
+    # the compiled rulesets are cached with their rejection counters
+    monkeypatch.setattr(shortlist_rules, "_rulesets", {})
+
+@pytest.mark.parametrize("profile", ["default", "senior"])
+def test_filter_batch_matches_filter(fresh_rulesets, profile):
+    rng = random.Random(7)
+    data = {f"rec{i}": applicant(rng, i) for i in range(300)}
+
+    filtered, rejected = extract_filter_evaluate.filter(data, profile)
+    expected_stats = shortlist_rules.get_ruleset(profile).stats()
+    shortlist_rules._rulesets.clear()
+    batch_filtered, batch_rejected = filter_batch(data, profile)
+
+    assert batch_filtered == filtered
+    assert batch_rejected == rejected
+    assert shortlist_rules.get_ruleset(profile).stats() == expected_stats
+    assert sum(expected_stats.values()) == len(rejected)
+
+def test_filter_batch_rejections(fresh_rulesets):
+    def record(i, rate, availability, location):
+        text, sha = encode_compressed_json({
+            "personal": {"Location": location},
+            "experience": [{"Company": "Google", "Start": "2020-01-01", "End": "2021-01-01"}],
+            "salary": {"Preferred Rate": rate, "Availability": availability},
+        })
+        return {"Application_ID": i, "Compressed_JSON": text, "SHA": sha}
+
+    data = {
+        "ok": record(1, 90, 30, "US"),
+        "rate": record(2, 120, 30, "US"),
+        # fails every rule after experience, only the first failure counts
+        "rate_and_more": record(3, 120, 5, "France"),
+        "availability": record(4, 90, 5, "US"),
+        "location": record(5, 90, 30, "France"),
+    }
+    filtered, rejected = filter_batch(data)
+    assert list(filtered) == ["ok"]
+    assert set(rejected) == {"rate", "rate_and_more", "availability", "location"}
+    assert shortlist_rules.get_ruleset().stats() == {"experience": 0, "max_rate": 2, "min_availability": 1, "location": 1}
+
+def years(*jobs, merge_overlaps=True):
+    record = {"experience": [{"Company": "Acme", "Start": start, "End": end} for start, end in jobs]}
+    return experience_years(ExperienceColumns([record]), merge_overlaps)[0] * 365
+
+def test_merge_overlaps():
+    # overlapping jobs count once
+    assert years(("2020-01-01", "2020-01-11"), ("2020-01-06", "2020-01-16")) == 15
+    assert years(("2020-01-01", "2020-01-11"), ("2020-01-06", "2020-01-16"), merge_overlaps=False) == 20
+    # a job nested in another one adds nothing, whatever the order
+    assert years(("2020-01-03", "2020-01-05"), ("2020-01-01", "2020-01-11")) == 10
+    # adjacent and disjoint jobs add up
+    assert years(("2020-01-01", "2020-01-11"), ("2020-01-11", "2020-01-21")) == 20
+    assert years(("2020-01-01", "2020-01-11"), ("2020-02-01", "2020-02-11")) == 20
+    # a job ending before it starts counts for nothing
+    assert years(("2020-01-11", "2020-01-01")) == 0
+
+def test_merge_overlaps_per_applicant():
+    records = [
+        {"experience": [{"Start": "2020-01-01", "End": "2020-01-11"}, {"Start": "2020-01-01", "End": "2020-01-11"}]},
+        {"experience": []},
+        {"experience": [{"Start": "2020-01-05", "End": "2020-01-08"}, {"Start": "bad", "End": "2020-01-08"}]},
+    ]
+    assert (experience_years(ExperienceColumns(records), True) * 365).tolist() == pytest.approx([10, 0, 3])
+
+def test_merge_overlaps_filter(fresh_rulesets):
+    # two concurrent 3 year jobs: 6 years for filter(), 3 once merged
+    text, sha = encode_compressed_json({
+        "personal": {"Location": "US"},
+        "experience": [{"Company": "Acme", "Start": "2017-01-01", "End": "2020-01-01"},
+                       {"Company": "Initech", "Start": "2017-01-01", "End": "2020-01-01"}],
+        "salary": {"Preferred Rate": 90, "Availability": 30},
+    })
+    data = {"rec1": {"Application_ID": 1, "Compressed_JSON": text, "SHA": sha}}
+    assert list(extract_filter_evaluate.filter(data)[0]) == ["rec1"]
+    assert list(filter_batch(data)[0]) == ["rec1"]
+    assert list(filter_batch(data, merge_overlaps=True)[1]) == ["rec1"]
@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import extract_filter_evaluate
+from compressed_json import COMPACT_PREFIX, canonical_json, decode_compressed_json, encode_compressed_json, payload_sha
+from extract_filter_evaluate import format_batch_prompt, format_prompt
+from llm_cache import LLMCache, cache_key
+
+DATA = {
+    "personal": {"Full Name": "Jané Doe", "Location": "US"},
+    "experience": [{"Company": "Meta", "Start": "2020-01-01", "End": "2022-01-01"}] * 10,
+    "salary": {"Preferred Rate": 90, "Availability": 30},
+}
+
+def applicants():
+    plain, sha = encode_compressed_json(DATA)
+    compact, compact_sha = encode_compressed_json(DATA, compact=True)
+    assert compact.startswith(COMPACT_PREFIX) and sha == compact_sha
+    assert decode_compressed_json(compact) == decode_compressed_json(plain)
+    return {"Application_ID": 7, "Compressed_JSON": plain, "SHA": sha}, {"Application_ID": 7, "Compressed_JSON": compact, "SHA": sha}
+
+def test_payload_sha_ignores_the_encoding():
+    plain, compact = applicants()
+    assert payload_sha(plain["Compressed_JSON"]) == payload_sha(compact["Compressed_JSON"])
+    # a lead carries the applicant payload in its own Compressed_JSON
+    lead = lambda applicant: canonical_json({k: v for k, v in applicant.items() if k != "SHA"})
+    assert lead(plain) != lead(compact)
+    assert payload_sha(lead(plain)) == payload_sha(lead(compact))
+    changed = dict(plain, Compressed_JSON=encode_compressed_json(dict(DATA, salary={}))[0])
+    assert payload_sha(lead(changed)) != payload_sha(lead(plain))
+
+def test_cache_key_ignores_the_encoding():
+    plain, compact = applicants()
+    assert cache_key(plain, "prompt", "model") == cache_key(compact, "prompt", "model")
+    assert cache_key(plain, "prompt", "model") != cache_key(dict(plain, Application_ID=8), "prompt", "model")
+    assert cache_key(plain, "prompt", "model") != cache_key(plain, "other prompt", "model")
+
+def test_prompts_ignore_the_encoding():
+    plain, compact = applicants()
+    assert format_prompt(plain) == format_prompt(compact)
+    assert format_batch_prompt([plain]) == format_batch_prompt([compact])
+    # the SHA is bookkeeping, the llm never sees it
+    assert plain["SHA"] not in format_prompt(plain)
+    assert plain["SHA"] not in format_batch_prompt([plain])
+
+def test_batch_outputs_are_cached_under_the_batch_template(tmp_path, monkeypatch):
+    prompts = []
+    async def generate_content(prompt):
+        prompts.append(prompt)
+        output = {"Summary": "s", "Score": 5, "Issues": "None", "Follow-Ups": []}
+        if prompt.startswith(extract_filter_evaluate.BATCH_PROMPT_TEMPLATE[:200]):
+            return json.dumps([dict(output, Application_ID=i) for i in (1, 2)])
+        return json.dumps(output)
+    monkeypatch.setattr(extract_filter_evaluate, "generate_content", generate_content)
+
+    plain, _ = applicants()
+    items = [("rec1", dict(plain, Application_ID=1)), ("rec2", dict(plain, Application_ID=2))]
+    cache = LLMCache(str(tmp_path / "cache.sqlite"))
+    analyzed = asyncio.run(extract_filter_evaluate.analyze_items(items, cache, batch_tokens=10_000))
+    assert [x for x, parsed in analyzed if parsed is not None] == ["rec1", "rec2"] and len(prompts) == 1
+
+    template = extract_filter_evaluate.BATCH_PROMPT_TEMPLATE
+    model = extract_filter_evaluate.LLM_MODEL
+    assert cache.get(cache_key(items[0][1], template, model)) is not None
+    assert cache.get(cache_key(items[0][1], extract_filter_evaluate.PROMPT_TEMPLATE, model)) is None
+    # both lookups find the batch output, without another llm call
+    asyncio.run(extract_filter_evaluate.analyze_items(items[:1], cache))
+    assert len(prompts) == 1
+    assert cache.stats()["misses"] == 3
+    cache.close()
@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+import pytest
+
+from excercises.count_highest import count, count_file, count_parallel, count_stream, count_vectorized
+
+CASES = [
+    ([3,4,5,2,3,8,6,4,5], 4),
+    ([], 0),
+    ([1,2,3,4,5], 5),
+    ([2,2,2,2], 1),
+    ([5,4,3,2,1], 1),
+]
+
+MODES = [
+    count_vectorized,
+    lambda x: count_stream(x, chunk_size=2),
+    lambda x: count_stream(iter(x), chunk_size=3),
+    lambda x: count_parallel(x, workers=2, min_size=0),
+]
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("values,expected", CASES)
+def test_modes(mode, values, expected):
+    assert mode(values) == expected
+
+
+def test_modes_match_count_on_random_data():
+    rng = random.Random(7)
+    values = [rng.randint(-50, 10_000) for _ in range(5_000)]
+    expected = count(values)
+    assert count_vectorized(values) == expected
+    assert count_stream(np.array(values), chunk_size=97) == expected
+    assert count_parallel(values, workers=3, min_size=0) == expected
+
+
+def test_count_file(tmp_path):
+    values = np.array([3,4,5,2,3,8,6,4,5], dtype=np.int64)
+    path = tmp_path / "values.bin"
+    values.tofile(path)
+    assert count_file(str(path), chunk_size=4) == 4
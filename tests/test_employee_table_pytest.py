@@ -0,0 +1,28 @@
+import io
+
+from excercises.default_arg import Employee, EmployeeTable, payroll
+
+def test_calculat_salary_does_not_grow():
+    e = Employee("John", 34)
+    items = [1, 2, 3]
+    assert e.calculatSalary() == 20
+    assert e.calculatSalary() == 20
+    assert e.calculatSalary(items) == 6
+    assert items == [1, 2, 3]
+
+def test_employee_has_no_dict():
+    assert not hasattr(Employee("John"), "__dict__")
+
+def test_from_jsonl():
+    lines = io.StringIO('{"name": "John", "age": 34, "items": [100, 20]}\n\n{"name": "Jané"}\n')
+    table = EmployeeTable.from_jsonl(lines)
+    assert len(table) == 2
+    assert str(table[0]) == '{"name": "John", "age": 34}'
+    assert table.name(1) == "Jané"
+    assert table[1].age == 20
+
+def test_payroll_matches_calculat_salary():
+    table = EmployeeTable.from_csv(io.StringIO("name,age,base,bonus\nJohn,34,100,20\nJane,29,,\nJim,40,7,\n"))
+    expected = [Employee("x").calculatSalary(items) for items in ([100, 20], [], [7])]
+    assert payroll(table).tolist() == expected == [120, 20, 7]
+    assert payroll(EmployeeTable()).tolist() == []
@@ -0,0 +1,120 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from excercises.get_data_parse import MyError, MySession, get_data
+from excercises.http_cache import ResponseCache
+
+def test_memory_lru_by_entries():
+    cache = ResponseCache(max_entries=2, path=None)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    assert cache.lookup("a")[1]
+    cache.put("c", b"3")
+    # b was the least recently used
+    assert cache.lookup("b") == (None, False)
+    assert cache.lookup("a")[0].body == b"1"
+    assert cache.evictions == 1
+
+def test_memory_lru_by_bytes():
+    cache = ResponseCache(max_bytes=10, path=None)
+    cache.put("a", b"123456")
+    cache.put("b", b"123456")
+    assert cache.lookup("a") == (None, False)
+    assert cache.stats()["bytes"] == 6
+    # larger than the whole cache, not kept
+    cache.put("c", b"x" * 11)
+    assert cache.lookup("c") == (None, False)
+    assert cache.lookup("b")[1]
+
+def test_disk_store(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path=path, max_disk_entries=2)
+    for url in ("a", "b", "c"):
+        cache.put(url, url.encode(), etag=f'"{url}"')
+    cache.close()
+
+    reopened = ResponseCache(path=path)
+    entry, fresh = reopened.lookup("c")
+    assert fresh and entry.body == b"c" and entry.etag == '"c"'
+    # close() trimmed the store to the max_disk_entries most recent
+    assert reopened.lookup("b")[0] is not None
+    assert reopened.lookup("a") == (None, False)
+    reopened.close()
+
+def test_stale_entries_and_revalidated():
+    cache = ResponseCache(ttl=60, path=None)
+    cache.put("etag", b"1", etag='"v1"')
+    cache.put("plain", b"2")
+    for url in ("etag", "plain"):
+        cache.entries[url].stored -= 120
+
+    entry, fresh = cache.lookup("etag")
+    assert not fresh and entry.validators() == {"If-None-Match": '"v1"'}
+    # nothing to revalidate it with
+    assert cache.lookup("plain") == (None, False)
+
+    cache.revalidated("etag", entry, etag='"v2"')
+    entry, fresh = cache.lookup("etag")
+    assert fresh and entry.etag == '"v2"' and cache.revalidations == 1
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests:list = []
+
+    def do_GET(self):
+        Handler.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/html":
+            self.reply(200, b"<html>not json</html>", "text/html")
+        elif self.headers.get("If-None-Match") == '"v1"':
+            self.reply(304, b"")
+        else:
+            self.reply(200, b'[{"id": 1}, {"id": 2}]', "application/json")
+
+    def reply(self, status, body, content_type=None):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    Handler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_get_data_revalidation(server):
+    cache = ResponseCache(ttl=60, path=None)
+    session = MySession(cache)
+    url = f"{server}/posts"
+
+    assert get_data(session, url) == [{"id": 1}, {"id": 2}]
+    assert get_data(session, url) == [{"id": 1}, {"id": 2}]
+    # the fresh hit did not reach the server
+    assert Handler.requests == [("/posts", None)]
+
+    cache.entries[url].stored -= 120
+    assert get_data(session, url) == [{"id": 1}, {"id": 2}]
+    assert Handler.requests[-1] == ("/posts", '"v1"')
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1 and cache.revalidations == 1
+
+def test_get_data_non_json_is_not_cached(server):
+    cache = ResponseCache(path=None)
+    session = MySession(cache)
+    url = f"{server}/html"
+    for _ in range(2):
+        with pytest.raises(MyError):
+            get_data(session, url)
+    assert cache.lookup(url) == (None, False)
+    assert len(Handler.requests) == 2
@@ -0,0 +1,34 @@
+from journal import FAILED, Journal
+
+def test_journal_resume(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    with Journal(path, flush_every=1) as journal:
+        journal.record("rec1", "llm", "h1")
+        journal.record("rec2", "llm", "h2")
+        journal.record("rec2", "llm", "h2", FAILED)
+
+    with Journal(path, resume=True) as journal:
+        assert journal.done("rec1", "llm", "h1")
+        assert not journal.done("rec1", "llm", "changed")
+        assert not journal.done("rec2", "llm", "h2")
+        assert journal.skipped == 1
+
+def test_journal_torn_last_line(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    with Journal(path, flush_every=1) as journal:
+        journal.record("rec1", "llm", "h1")
+    # the crash cut the last write in the middle of a line
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"applicant":"rec2","stage":"llm","ha')
+
+    with Journal(path, resume=True, flush_every=1) as journal:
+        assert journal.done("rec1", "llm", "h1")
+        journal.record("rec3", "llm", "h3")
+
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    assert len(lines) == 3 and lines[-1] == ""
+    with Journal(path, resume=True) as journal:
+        assert journal.done("rec1", "llm", "h1")
+        assert journal.done("rec3", "llm", "h3")
+        assert not journal.done("rec2", "llm", "h2")
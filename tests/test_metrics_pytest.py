@@ -0,0 +1,12 @@
+from metrics import Registry
+
+def test_prometheus_label_escaping():
+    registry = Registry()
+    registry.inc("requests_total", endpoint='Leads "new"', error="a\\b\nc")
+    registry.observe("request_seconds", 0.02, endpoint="Leads")
+    lines = registry.to_prometheus().splitlines()
+    assert 'requests_total{endpoint="Leads \\"new\\"",error="a\\\\b\\nc"} 1' in lines
+    assert 'request_seconds_bucket{endpoint="Leads",le="0.025"} 1' in lines
+    assert 'request_seconds_count{endpoint="Leads"} 1' in lines
+    # one sample per line, whatever the label values
+    assert len(lines) == 2 + 1 + 14 + 2
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from excercises.persistent_dict import EMPTY, PersistentDict, freeze, thaw
+
+class SameHash:
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return 7
+
+    def __eq__(self, other):
+        return isinstance(other, SameHash) and other.value == self.value
+
+def test_behaves_like_dict():
+    rng = random.Random(5)
+    keys = [rng.randint(0, 500) for _ in range(200)] + [SameHash(i) for i in range(5)] + ["a", -1, -2]
+    expected = {}
+    p = EMPTY
+    for i in range(2000):
+        key = rng.choice(keys)
+        if key in expected and rng.random() < 0.3:
+            p = p.delete(key)
+            del expected[key]
+        else:
+            p = p.set(key, i)
+            expected[key] = i
+    assert p == expected
+    assert len(p) == len(expected)
+    assert set(p) == set(expected)
+    assert PersistentDict(expected) == expected
+    with pytest.raises(KeyError):
+        EMPTY.delete("missing")
+
+def test_versions_are_unchanged():
+    v1 = PersistentDict(a=1, b=2)
+    v2 = v1.set("a", 10).delete("b")
+    assert v1 == {"a": 1, "b": 2}
+    assert v2 == {"a": 10}
+    assert v1.snapshot() is v1
+
+def test_nested_updates_share_the_rest():
+    state = freeze({"users": {"u1": {"theme": "dark", "limits": [1, 2]}, "u2": {"theme": "dark"}}})
+    updated = state.set_in(("users", "u1", "theme"), "light")
+    assert state.get_in(("users", "u1", "theme")) == "dark"
+    assert updated.get_in(("users", "u1", "theme")) == "light"
+    assert updated["users"]["u2"] is state["users"]["u2"]
+    assert thaw(updated) == {"users": {"u1": {"theme": "light", "limits": [1, 2]}, "u2": {"theme": "dark"}}}
+    assert state.set_in(("new", "path"), 1).get_in(("new", "path")) == 1
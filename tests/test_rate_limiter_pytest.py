@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from rate_limiter import AdaptiveLimiter
+
+def test_limits_the_requests_in_flight():
+    async def run():
+        limiter = AdaptiveLimiter(rate=1000, burst=1000, max_concurrency=2, min_concurrency=2)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with limiter:
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[call() for _ in range(10)])
+        return limiter, peak
+
+    limiter, peak = asyncio.run(run())
+    assert peak == 2 and limiter.in_flight == 0
+
+def test_cancelled_while_waiting_for_a_token():
+    async def run():
+        # one token, the second caller sleeps for the next one
+        limiter = AdaptiveLimiter(rate=0.5, burst=1, max_concurrency=5, min_concurrency=5)
+        async with limiter:
+            pass
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.05)
+        assert limiter.in_flight == 1
+        waiting.cancel()
+        try:
+            await waiting
+        except asyncio.CancelledError:
+            pass
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.in_flight == 0
+
+def test_429_halves_the_limit_and_pauses():
+    limiter = AdaptiveLimiter(max_concurrency=10, min_concurrency=1)
+    limit = limiter.limit
+    limiter.record(429, "2")
+    assert limiter.limit == limit / 2
+    assert limiter.throttled == 1
+    assert 1.5 < limiter.backoff(1) <= 2
+    limiter.record(200)
+    assert limiter.limit > limit / 2
+
+def test_wait_sync_is_refused_in_an_event_loop():
+    limiter = AdaptiveLimiter()
+    limiter.wait_sync()
+
+    async def run():
+        limiter.wait_sync()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+import shortlist_rules
+from shortlist_rules import RULES_FILE, calculate_experience_years, compile_ruleset, get_ruleset, load_rulesets
+
+def applicant(location="US", rate=90, availability=30, experience=None):
+    if experience is None:
+        experience = [{"Company": "Acme", "Start": "2015-01-01", "End": "2020-01-01"}]
+    return {
+        "personal": {"Location": location},
+        "experience": experience,
+        "salary": {"Preferred Rate": rate, "Availability": availability},
+    }
+
+DEFAULT = [
+    {"rule": "experience", "min_years": 4, "tier1_companies": ["Google"]},
+    {"rule": "max_rate", "value": 100},
+    {"rule": "min_availability", "value": 20},
+    {"rule": "location", "allowed": ["US", "UK"]},
+]
+
+def test_experience_years():
+    assert calculate_experience_years([{"Start": "2020-01-01", "End": "2021-01-01"}]) == 366 / 365
+    # missing and malformed dates are not counted
+    assert calculate_experience_years([{"Start": "2020-01-01"}, {"Start": "x", "End": "2021-01-01"}]) == 0
+
+def test_rule_evaluation():
+    ruleset = compile_ruleset("test", DEFAULT)
+    assert ruleset.evaluate(applicant()) == (True, "Applicant has more than 4 years of experience. Rate is less than 100. Availability is greater than 20 hours/week")
+    assert ruleset.evaluate(applicant(rate=101)) == (False, "")
+    assert ruleset.evaluate(applicant(availability=19))[0] is False
+    assert ruleset.evaluate(applicant(location="France"))[0] is False
+    assert ruleset.evaluate({"personal": {"Location": "US"}, "experience": []})[0] is False
+
+def test_experience_reasons():
+    ruleset = compile_ruleset("test", DEFAULT)
+    short = [{"Company": "Google", "Start": "2020-01-01", "End": "2021-01-01"}]
+    long_tier1 = [{"Company": "Google", "Start": "2010-01-01", "End": "2020-01-01"}]
+    assert ruleset.evaluate(applicant(experience=short))[1].startswith("Applicant has has tier 1 company experience.")
+    assert ruleset.evaluate(applicant(experience=long_tier1))[1].startswith(
+        "Applicant has more than 4 years of experience and worked in tier1 company.")
+    assert ruleset.evaluate(applicant(experience=[{"Company": "Acme", "Start": "2020-01-01", "End": "2021-01-01"}]))[0] is False
+
+def test_rejections_are_counted_on_the_first_failing_rule():
+    ruleset = compile_ruleset("test", DEFAULT)
+    ruleset(applicant(rate=200, location="France"))
+    ruleset(applicant(location="France"))
+    ruleset(applicant())
+    assert ruleset.stats() == {"experience": 0, "max_rate": 1, "min_availability": 0, "location": 1}
+    assert ruleset.evaluated == 3
+
+def test_reorder_by_rejections(monkeypatch):
+    monkeypatch.setattr(shortlist_rules, "REORDER_EVERY", 4)
+    ruleset = compile_ruleset("test", DEFAULT)
+    for _ in range(3):
+        ruleset(applicant(location="France"))
+    # not reordered before REORDER_EVERY evaluations
+    assert [rule.name for rule in ruleset.order] == ["experience", "max_rate", "min_availability", "location"]
+    ruleset(applicant(location="France"))
+    assert ruleset.order[0].name == "location"
+    # the reason keeps the order of the config
+    assert [rule.name for rule in ruleset.rules] == ["experience", "max_rate", "min_availability", "location"]
+    assert ruleset.evaluate(applicant())[1] == "Applicant has more than 4 years of experience. Rate is less than 100. Availability is greater than 20 hours/week"
+
+def test_load_profiles():
+    rulesets = load_rulesets()
+    assert set(rulesets) == {"default", "senior"}
+    with open(RULES_FILE) as f:
+        config = json.load(f)
+    for name, ruleset in rulesets.items():
+        assert [rule.name for rule in ruleset.rules] == [entry["rule"] for entry in config[name]]
+    senior = rulesets["senior"]
+    assert senior.rules[0].params == {"min_years": 8, "tier1_companies": []}
+    # 5 years and a rate of 90 pass the default profile but not the senior one
+    assert rulesets["default"].evaluate(applicant())[0] is True
+    assert senior.evaluate(applicant())[0] is False
+
+def test_invalid_profiles(tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"bad": [{"rule": "unknown"}]}))
+    with pytest.raises(ValueError):
+        load_rulesets(str(path))
+    with pytest.raises(TypeError):
+        compile_ruleset("bad", [{"rule": "max_rate", "limit": 3}])
+
+    monkeypatch.setattr(shortlist_rules, "_rulesets", {})
+    with pytest.raises(ValueError):
+        get_ruleset("missing")
+    assert get_ruleset("default") is get_ruleset("default")